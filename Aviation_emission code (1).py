@@ -1,264 +1,342 @@
+import copy
+import logging
+import os
+import threading
+import time
+
 import streamlit as st
-import folium
 from streamlit_folium import st_folium
 import pandas as pd
-import numpy as np
 from PIL import Image
-import plotly.express as px
-
-@st.cache_data
-def load_and_prepare_flights(max_distance_km=None):
-    # -------------------------
-    # Flights data (parquet)
-    # -------------------------
-    df5 = pd.read_parquet("flights_hackaton_20230701-20230801.parquet")
-    df5 = df5[df5["ADEP"] == "EHAM"]
-
-    df6 = pd.read_parquet("flights_hackaton_20230801-20230901.parquet")
-    df6 = df6[df6["ADEP"] == "EHAM"]
-
-    df_fl = pd.concat([df5, df6], ignore_index=True)
-
-    # -------------------------
-    # Sustainability data
-    # -------------------------
-    dftest = pd.read_csv(
-        "LCC&FCC_Flights_Final_Sustainability_Score_and_Rating.csv"
-    )
-    dftest = dftest[dftest["ADEP"] == "EHAM"]
-
-    # -------------------------
-    # Merge
-    # -------------------------
-    dfm = df_fl[["ADES", "NAME_ADES"]]
-
-    dfmerge = dftest.merge(dfm, on="ADES", how="left")
 
-    # -------------------------
-    # Kolommen herschikken
-    # -------------------------
-    dfmerge.insert(0, "Vertrek", "Schiphol")
-    dfmerge.insert(1, "Bestemming", dfmerge.pop("NAME_ADES"))
-
-    # -------------------------
-    # Opschonen
-    # -------------------------
-    dfmerge = dfmerge.drop_duplicates()
-
-    if max_distance_km is not None:
-        dfmerge = dfmerge[
-            dfmerge["Actual Distance Flown (km)"] <= max_distance_km
-        ]
-
-    dfmerge = dfmerge.drop(
-        [
-            "CO2 per FC seat (kg/km/seat)",
-            "CO2 per PEC seat (kg/km/seat)",
-            "Jet Engine type",
-        ],
-        axis=1,
-        errors="ignore"
-    )
+import queries
+from aggregates import build_cube
+from diagnostics import (
+    configure_logging,
+    mark_cache_miss,
+    recent_records,
+    run_records,
+    stage,
+    start_run,
+)
+from figures import (
+    METRIC_FIGURES,
+    TAB_FIGURES,
+    flight_co2_figure,
+    metric_figure,
+    train_co2_figure,
+)
+from maps import base_map, highlight_layer, route_geojson
+from pipeline import (
+    FLIGHTS_SOURCE,
+    ORIGIN,
+    ORIGINS,
+    STORE_DIR,
+    build_route_tables,
+    dataset_version,
+    distance_view,
+    load_prepared,
+    origin_name,
+)
+from ranking import DIRECTIONS, WEIGHTS, rank
+from rail import origin_station, rail_routes, route_totals, score_segments, segment_table
+from scenario import build_scenario, max_distance, scenario_at
+from streaming import has_aggregates, read_aggregates
 
-    # -------------------------
-    # Missing values invullen
-    # -------------------------
-    num_cols = dfmerge.select_dtypes(include="number").columns
-    cat_cols = dfmerge.select_dtypes(exclude="number").columns
+configure_logging()
+start_run()
 
-    dfmerge[num_cols] = dfmerge.groupby("Bestemming")[num_cols].transform(
-        lambda x: x.fillna(x.median())
+# -------------------------
+# Gedeelde data
+# -------------------------
+# Alles via st.cache_resource: één object per proces dat alle sessies delen,
+# zonder kopie per aanroep (st.cache_data pickled elke keer). De frames
+# worden nergens aangepast; met copy-on-write leveren selecties daarop
+# views op en nooit wijzigingen aan het gedeelde origineel.
+#
+# Elke luchthaven is een eigen cache entry met alleen zijn eigen rijen.
+# max_entries houdt de twee laatst gekozen luchthavens vast, zodat meer
+# luchthavens het geheugen niet laten groeien.
+ORIGIN_ENTRIES = 2
+
+# Afstandsgrens van de kaart, de routetabellen en de treinroutes
+MAP_DISTANCE_KM = 500
+
+# "duckdb" beantwoordt de dashboardqueries direct uit de store (na
+# `python pipeline.py ingest`), zonder de dataset eerst in pandas te laden.
+# Zonder duckdb of store valt de app terug op pandas.
+QUERY_BACKEND = os.environ.get("AVIATION_QUERY_BACKEND", "pandas")
+
+def use_sql(origin):
+    return (
+        QUERY_BACKEND == "duckdb"
+        and queries.available()
+        and queries.has_store(STORE_DIR, origin)
     )
 
-    dfmerge[cat_cols] = dfmerge.groupby("Bestemming")[cat_cols].transform(
-        lambda x: x.fillna(
-            x.mode().iloc[0] if not x.mode().empty else np.nan
+@st.cache_resource
+def query_connection():
+    return queries.connect()
+
+# Elke loader heeft alleen verplichte, positionele parameters en wordt overal
+# met dezelfde argumenten aangeroepen. st.cache_resource maakt de key van de
+# meegegeven argumenten zonder defaults in te vullen: (version, "EHAM") en
+# (version, "EHAM", FLIGHTS_SOURCE) zouden twee entries met hetzelfde
+# resultaat zijn. De bron is altijd FLIGHTS_SOURCE; version volgt die.
+
+@st.cache_resource(max_entries=ORIGIN_ENTRIES)
+def load_and_prepare_flights(version, origin):
+    # version zit alleen in de cache key: één dataset per versie
+    mark_cache_miss()
+    return load_prepared(FLIGHTS_SOURCE, origin)
+
+@st.cache_resource(max_entries=2 * ORIGIN_ENTRIES)
+def load_distance_view(version, origin, max_distance_km):
+    mark_cache_miss()
+    return distance_view(load_and_prepare_flights(version, origin), max_distance_km)
+
+@st.cache_resource(max_entries=2 * ORIGIN_ENTRIES)
+def load_cube(version, origin, max_distance_km):
+    mark_cache_miss()
+    # Zonder afstandsgrens zijn de aggregaten van stream_prepare genoeg
+    # (count/sum/mean) voor SQL, dat dezelfde store leest. Met pandas komt
+    # de cube uit de exacte tabel van load_prepared.
+    if max_distance_km is None and use_sql(origin) and has_aggregates(STORE_DIR, origin):
+        return read_aggregates(STORE_DIR, origin)
+    if use_sql(origin):
+        return queries.build_cube(query_connection(), STORE_DIR, origin, max_distance_km)
+    return build_cube(load_distance_view(version, origin, max_distance_km))
+
+@st.cache_resource(max_entries=ORIGIN_ENTRIES)
+def load_route_geojson(version, origin, max_distance_km):
+    mark_cache_miss()
+    if use_sql(origin):
+        return route_geojson(
+            queries.map_rows(query_connection(), STORE_DIR, origin, max_distance_km)
         )
+    return route_geojson(load_distance_view(version, origin, max_distance_km))
+
+@st.cache_resource(max_entries=ORIGIN_ENTRIES)
+def load_route_tables(version, origin, max_distance_km):
+    mark_cache_miss()
+    return build_route_tables(load_distance_view(version, origin, max_distance_km))
+
+@st.cache_resource(max_entries=64)
+def load_route_table(version, route, origin, max_distance_km):
+    mark_cache_miss()
+    # Met SQL alleen de gekozen route ophalen, anders uit de voorbereide tabellen
+    if use_sql(origin):
+        return queries.route_table(
+            query_connection(), route, STORE_DIR, origin, max_distance_km
+        )
+    return load_route_tables(version, origin, max_distance_km)[route]
+
+@st.cache_resource(max_entries=ORIGIN_ENTRIES)
+def load_base_map(version, origin):
+    mark_cache_miss()
+    # Eén gedeelde basiskaart per datasetversie en luchthaven, de selectie
+    # komt er als losse laag bovenop
+    return base_map(load_route_geojson(version, origin, MAP_DISTANCE_KM))
+
+@st.cache_resource(max_entries=2 * ORIGIN_ENTRIES)
+def treinroutes(version, origin, max_distance_km):
+    mark_cache_miss()
+    # Routes via het kortste (minste CO₂) pad door het spoornetwerk, met de
+    # uitstoot per segment en per bestemming in één gevectoriseerde stap.
+    # Alle bestemmingen binnen de afstand krijgen automatisch een route.
+    if use_sql(origin):
+        bestemmingen = queries.destinations(
+            query_connection(), STORE_DIR, origin, max_distance_km
+        )
+    else:
+        bestemmingen = (
+            load_distance_view(version, origin, max_distance_km)["Bestemming"]
+            .dropna()
+            .unique()
+        )
+    segments = score_segments(segment_table(
+        rail_routes(bestemmingen, origin=origin_station(origin))
+    ))
+    return segments, route_totals(segments)
+
+@st.cache_resource(max_entries=ORIGIN_ENTRIES)
+def load_scenario(version, origin):
+    mark_cache_miss()
+    _, train_totals = treinroutes(version, origin, None)
+    if use_sql(origin):
+        flights = queries.scenario_rows(query_connection(), STORE_DIR, origin)
+    else:
+        flights = load_and_prepare_flights(version, origin)
+    return build_scenario(flights, train_totals)
+
+# Standaardinstellingen van de ranking in de zijbalk; de warm-up rekent met
+# dezelfde waarden, zodat hij de key van een nieuwe sessie vult
+DEFAULT_WEIGHTS = tuple((metric, WEIGHTS[metric]) for metric in DIRECTIONS)
+DEFAULT_TOP_K = 3
+DEFAULT_MIN_COUNT = 1
+
+@st.cache_resource(max_entries=32)
+def load_ranking(version, dims, origin, k, weights, min_count):
+    mark_cache_miss()
+    # Top-k op de gedeelde cube, per instelling één keer berekend
+    return rank(load_cube(version, origin, None), dims, k, dict(weights), min_count)
+
+@st.cache_resource(max_entries=16 * ORIGIN_ENTRIES)
+def load_figure(version, name, origin):
+    mark_cache_miss()
+    # Eén keer bouwen per datasetversie, luchthaven en grafiek (met vaste
+    # sortering); een rerun stuurt alleen de al gebouwde figuur
+    if name == "train_co2":
+        return train_co2_figure(treinroutes(version, origin, MAP_DISTANCE_KM)[1])
+    if name == "flight_co2":
+        return flight_co2_figure(load_cube(version, origin, MAP_DISTANCE_KM))
+    return metric_figure(load_cube(version, origin, None), name)
+
+def top_k_markdown(ranking, label):
+    if ranking.empty:
+        return f"Not enough flights to rank the {label}."
+    regels = "\n".join(
+        f"{i}. **{' / '.join(map(str, naam)) if isinstance(naam, tuple) else naam}**"
+        for i, naam in enumerate(ranking.index, start=1)
     )
-    rating_map = {
-    "A": 7,
-    "B": 6,
-    "C": 5,
-    "D": 4,
-    "E": 3,
-    "F": 2,
-    "G": 1
-    }
+    return f"""
+**The best {label} for the environment are:**
 
-    dfmerge['CO2 Rating Num'] = dfmerge["CO2 Rating"].map(rating_map)
-    dfmerge['Sustainability rating num'] = dfmerge['Sustainability Rating'].map(rating_map)
-    airline_map = {
-    "KLM": "KLM Royal Dutch Airlines",
-    "TRA": "Transavia",
-    "SXS": "SunExpress",
-    "AEE": "Aegean Airlines",
-    "VLG": "Vueling Airlines",
-    "EZS": "easyJet Switzerland",
-    "ASL": "ASL Airlines",
-    "AMC": "Air Malta Charter",
-    "ROT": "TAROM",
-    "RYR": "Ryanair",
-    "EIN": "Aer Lingus",
-    "DLH": "Lufthansa",
-    "CPA": "Cathay Pacific",
-    "FIN": "Finnair",
-    "THY": "Turkish Airlines",
-    "PGT": "Pegasus Airlines",
-    "ICE": "Icelandair",
-    "TAP": "TAP Air Portugal",
-    "BAW": "British Airways",
-    "AEA": "Air Europa",
-    "IBE": "Iberia",
-    "AFR": "Air France",
-    "UAE": "Emirates",
-    "BTI": "airBaltic",
-    "AUA": "Austrian Airlines",
-    "LOT": "LOT Polish Airlines",
-    "CTN": "Croatia Airlines",
-    "SWR": "SWISS International Air Lines"
-    }
-    dfmerge["AC Operator"] = dfmerge["AC Operator"].map(airline_map)
-    dfmerge["Route"] = dfmerge["Vertrek"] + " → " + dfmerge["Bestemming"]
-    dfmerge['CO2 per passenger'] = dfmerge['CO2 per Passenger (kg/km/passenger)'] * dfmerge['Actual Distance Flown (km)']
-    return dfmerge.sort_values("Bestemming").reset_index(drop=True)
-
-@st.cache_data
-def treinroutes():
-    treinroutes = {
-
-    "Billund": [
-        {"van": "Amsterdam", "naar": "Osnabrück", "vervoer": "an ICE", "km": 215},
-        {"van": "Osnabrück", "naar": "Hamburg", "vervoer": "an ICE", "km": 192},
-        {"van": "Hamburg", "naar": "Flensburg", "vervoer": "an Intercity", "km": 141},
-        {"van": "Flensburg", "naar": "Kolding", "vervoer": "an Intercity", "km": 80},
-        {"van": "Kolding", "naar": "Vejle", "vervoer": "an Intercity", "km": 45},
-        {"van": "Vejle", "naar": "Billund", "vervoer": "a Bus", "km": 33},
-    ],
-    "Birmingham": [
-        {"van": "Amsterdam", "naar": "Brussels", "vervoer": "a Eurostar", "km": 176},
-        {"van": "Brussels", "naar": "London", "vervoer": "a Eurostar", "km": 317},
-        {"van": "London", "naar": "Birmingham", "vervoer": "a Regional train", "km": 163}
-    ],
-
-    "Bremen": [
-        {"van": "Amsterdam", "naar": "Osnabrück", "vervoer": "an ICE", "km": 215},
-        {"van": "Osnabrück", "naar": "Bremen", "vervoer": "an ICE", "km": 103}
-    ],
-
-    "Brussels": [
-        {"van": "Amsterdam", "naar": "Brussels", "vervoer": "a Eurostar", "km": 176}
-    ],
-
-    "Düsseldorf": [
-        {"van": "Amsterdam", "naar": "Arnhem", "vervoer": "an Intercity", "km": 97},
-        {"van": "Arnhem", "naar": "Düsseldorf", "vervoer": "an Intercity", "km": 105}
-    ],
-
-    "Frankfurt": [
-        {"van": "Amsterdam", "naar": "Cologne", "vervoer": "an ICE", "km": 214},
-        {"van": "Cologne", "naar": "Frankfurt", "vervoer": "an ICE", "km": 152}
-    ],
-
-
-    "Hamburg": [
-        {"van": "Amsterdam", "naar": "Osnabrück", "vervoer": "an ICE", "km": 215},
-        {"van": "Osnabrück", "naar": "Hamburg", "vervoer": "an ICE", "km": 192}
-    ],
-
-    "Hanover": [
-        {"van": "Amsterdam", "naar": "Hannover", "vervoer": "an ICE", "km": 329}
-    ],    
-
-    "London": [
-        {"van": "Amsterdam", "naar": "Brussels", "vervoer": "a Eurostar", "km": 176},
-        {"van": "Brussels", "naar": "London", "vervoer": "a Eurostar", "km": 317}
-    ],
-
-
-    "Luxembourg": [
-        {"van": "Amsteram", "naar": "Brussels", "vervoer": "a Eurostar", "km": 176},
-        {"van": "Brussels", "naar": "Luxembourg", "vervoer": "an Intercity", "km": 186}   
-    ],
-
-
-    "Paris": [
-        {"van": "Amsterdam", "naar": "Paris", "vervoer": "a Eurostar", "km": 431},
-        
-    ],
-    }
+{regels}
 
-    treinuitstoot = {
-        "a Eurostar": 0.009,
-        "an Intercity": 0.0114,
-        "a Regional train": 0.0292,
-        "a Bus": 0.0947,
-        "an ICE": 0.0032
-    }
-
-
-    resultaten = []
-
-    for bestemming, segments in treinroutes.items():
-        totale_co2 = 0
-
-        for seg in segments:
-            km = seg["km"]
-            vervoer = seg["vervoer"]
-            totale_co2 += km * treinuitstoot[vervoer]
+This top {len(ranking)} is determined by an **overall score** based on the **three main environmental metrics**.
+"""
 
-        resultaten.append({
-            "Bestemming": bestemming,
-            "Totale_CO2_kg": round(totale_co2, 2)
-        })
-
-    df_trein_co2 = pd.DataFrame(resultaten)
-
-    return treinroutes, treinuitstoot, df_trein_co2
-
-# Met 500 km limiet
-if "dfmerge_500" not in st.session_state:
-    st.session_state.dfmerge_500 = load_and_prepare_flights(
-        max_distance_km=500
-    )
+def current_version(origin):
+    if use_sql(origin):
+        # De store bepaalt wat er te zien is, dus ook de cache key
+        return queries.store_version(STORE_DIR, origin)
+    return dataset_version()
 
-# Zonder afstandslimiet
-if "dfmerge_all" not in st.session_state:
-    st.session_state.dfmerge_all = load_and_prepare_flights(
-        max_distance_km=None
+# -------------------------
+# Warm-up
+# -------------------------
+# Eén achtergrondthread per proces vult alle gedeelde caches voor de
+# standaardluchthaven. Sessies die tijdens de warm-up binnenkomen tonen een
+# laadmelding; daarna wacht elke aanroep via de lock van st.cache_resource
+# op dezelfde berekening in plaats van een eigen te starten. De aanroepen
+# zijn precies die van de pagina met de standaardinstellingen.
+#
+# De thread hoort bij geen sessie en heeft dus geen ScriptRunContext; de
+# spinner van st.cache_resource meldt dat bij elke aanroep. Alleen voor
+# deze thread wordt die melding weggefilterd.
+
+FIGURE_NAMES = ["train_co2", "flight_co2"] + list(METRIC_FIGURES)
+RANKING_DIMENSIONS = ["Engine Model", "AC Operator", "Aircraft Variant"]
+WARMUP_THREAD = "cache-warmup"
+SCRIPT_RUN_CONTEXT_LOGGER = "streamlit.runtime.scriptrunner_utils.script_run_context"
+
+def warm_caches(status, origin=ORIGIN):
+    def step(name):
+        status["step"] = name
+
+    try:
+        version = current_version(origin)
+        if not use_sql(origin):
+            step("flights")
+            if load_and_prepare_flights(version, origin).empty:
+                return
+            step("route tables")
+            load_route_tables(version, origin, MAP_DISTANCE_KM)
+        step("aggregates")
+        load_cube(version, origin, MAP_DISTANCE_KM)
+        load_cube(version, origin, None)
+        step("train routes")
+        treinroutes(version, origin, MAP_DISTANCE_KM)
+        step("map")
+        load_base_map(version, origin)
+        step("scenario")
+        load_scenario(version, origin)
+        step("figures")
+        for name in FIGURE_NAMES:
+            load_figure(version, name, origin)
+        for dims in RANKING_DIMENSIONS:
+            load_ranking(
+                version, dims, origin, DEFAULT_TOP_K, DEFAULT_WEIGHTS, DEFAULT_MIN_COUNT
+            )
+    except Exception as err:
+        # De sessies rekenen dan zelf en tonen de fout zoals altijd
+        status["error"] = repr(err)
+    finally:
+        status["seconds"] = round(time.perf_counter() - status["started"], 3)
+        status["ready"].set()
+
+@st.cache_resource
+def warmup(origin=ORIGIN):
+    status = {
+        "origin": origin,
+        "step": "starting",
+        "error": None,
+        "started": time.perf_counter(),
+        "ready": threading.Event(),
+    }
+    logging.getLogger(SCRIPT_RUN_CONTEXT_LOGGER).addFilter(
+        lambda record: record.threadName != WARMUP_THREAD
     )
+    threading.Thread(
+        target=warm_caches, args=(status, origin), name=WARMUP_THREAD, daemon=True
+    ).start()
+    return status
 
-if "dftrain" not in st.session_state:
-    _,_,st.session_state.dftrain = treinroutes()
+st.set_page_config(layout="wide")
 
-if "route" not in st.session_state:
-    st.session_state.route,_,_ = treinroutes()
+vertrek_code = st.sidebar.selectbox(
+    "Departure airport",
+    list(ORIGINS),
+    format_func=lambda code: f"{origin_name(code)} ({code})",
+    key="vertrek"
+)
+vertrek = origin_name(vertrek_code)
 
-if "uitstoot" not in st.session_state:
-    _,st.session_state.uitstoot,_ = treinroutes()
+with st.sidebar.expander("Overall score"):
+    st.caption("Weight of each metric in the ranking of engines, airlines and aircraft.")
+    gewichten = tuple(
+        (metric, st.slider(metric, 0.0, 1.0, weight, 0.1))
+        for metric, weight in DEFAULT_WEIGHTS
+    )
+    top_k = st.number_input("Top", min_value=1, max_value=20, value=DEFAULT_TOP_K)
+    min_vluchten = st.number_input("Minimum flights", min_value=1, value=DEFAULT_MIN_COUNT)
 
+warm_status = warmup()
 
+@st.fragment(run_every=1)
+def wacht_op_warmup():
+    # Lichte pagina die elke seconde kijkt of de caches klaar zijn
+    if warm_status["ready"].is_set():
+        st.rerun()
+    st.info(f"Preparing the dashboard data ({warm_status['step']})…")
 
+if vertrek_code == warm_status["origin"] and not warm_status["ready"].is_set():
+    st.title("Aviation Emission Dashboard")
+    wacht_op_warmup()
+    st.stop()
 
-df_500 = st.session_state.dfmerge_500
-df_all = st.session_state.dfmerge_all
-treinroutes = st.session_state.route
-treinuitstoot = st.session_state.uitstoot
-dfuitstoot = st.session_state.dftrain
+version = current_version(vertrek_code)
+if not use_sql(vertrek_code):
+    if load_and_prepare_flights(version, vertrek_code).empty:
+        st.warning(f"No flights departing from {vertrek} ({vertrek_code}) in this dataset.")
+        st.stop()
 
-st.set_page_config(layout="wide")
+with stage("load_data", kind="cache", cached=True):
+    treinsegmenten, dfuitstoot = treinroutes(version, vertrek_code, MAP_DISTANCE_KM)
 
 st.title("Aviation Emission Dashboard")
 
 st.sidebar.title("Introduction 📖")
-st.sidebar.markdown("""
+st.sidebar.markdown(f"""
 Sustainability has become a key priority in modern mobility planning.  
 The aviation sector is responsible for approximately **3.5% of global CO₂ emissions**, driving the need for more sustainable transport solutions.
 
-This dashboard explores how **short-haul flights from Schiphol Amsterdam** could be replaced by **lower-emission train connections** within Europe.  
+This dashboard explores how **short-haul flights from {vertrek}** could be replaced by **lower-emission train connections** within Europe.  
 It provides data-driven insights to support **governments and policy makers** in reducing aviation-related emissions.
 
 ### What this dashboard shows
-- ✈️ Short haul flights departing from **Schiphol Amsterdam**
+- ✈️ Short haul flights departing from **{vertrek}**
 - 📊 Ranking of **engines, aircraft and airlines**
 - 🌱 Environmental performance based on:
   1. CO₂ rating  
@@ -270,89 +348,54 @@ It provides data-driven insights to support **governments and policy makers** in
 
 
 st.header("✈️ Flying routes")
-st.write("Note: All flights are departing from Schiphol and are under 500 km")
+st.write(f"Note: All flights are departing from {vertrek} and are under 500 km")
 
-dfmap = df_500.copy()
-dfmap = dfmap.drop_duplicates(subset = ['Vertrek', 'Bestemming'])
-dfmap = dfmap[['Vertrek', 'Bestemming', 'ADEP Latitude', 'ADEP Longitude', 'ADES Latitude', 'ADES Longitude', "Route"]]
+with stage("map", kind="render", cached=True):
+    routes_geojson = load_route_geojson(version, vertrek_code, MAP_DISTANCE_KM)
 
-df = dfmap.copy()
-
-routes = df["Route"].unique()
-gekozen_route = st.selectbox(
-    "Select a flight",
-    ["No selection"] + sorted(list(routes))
-)
-
-# -------------------------
-# FOLIUM MAP
-# -------------------------
-m = folium.Map(
-    location=[52.3676, 5.2],  # Amsterdam
-    zoom_start=5,
-    tiles="cartodbdark_matter"
-)
+    routes = {feature["properties"]["Route"] for feature in routes_geojson["features"]}
+    gekozen_route = st.selectbox(
+        "Select a flight",
+        ["No selection"] + sorted(routes)
+    )
 
-# -------------------------
-# ROUTES TEKENEN
-# -------------------------
-for _, row in df.iterrows():
-    vertrek = [row["ADEP Latitude"], row["ADEP Longitude"]]
-    bestemming = [row["ADES Latitude"], row["ADES Longitude"]]
-
-    if row["Route"] == gekozen_route:
-        kleur = "lime"
-        gewicht = 3
-        opacity = 0.9
-        zindex = 10
-    else:
-        kleur = "gray"
-        gewicht = 2
-        opacity = 0.4
-        zindex = 1
-
-    folium.PolyLine(
-        locations=[vertrek, bestemming],
-        color=kleur,
-        weight=gewicht,
-        opacity=opacity,
-        tooltip=row["Route"],
-        z_index=zindex
-    ).add_to(m)
+    # -------------------------
+    # FOLIUM MAP
+    # -------------------------
+    # st_folium voegt de highlightlaag aan de kaart toe; de gecachte kaart
+    # wordt door alle sessies gedeeld, dus elke run krijgt een eigen kopie
+    m = copy.deepcopy(load_base_map(version, vertrek_code))
 
-# -------------------------
-# MAP TONEN
-# -------------------------
-st_folium(m, width=1500, height=700)
-
-dfroute = df_500.copy()
-if gekozen_route != "No selection":
-    # Filter op de gekozen route
-    df_route = dfroute[dfroute["Route"] == gekozen_route].copy()
-    
- 
-    df_route = df_route.sort_values(
-        by=['CO2 Rating Num', 'CO2 per passenger','Sustainability rating num'],
-        ascending=[False, True, True] 
+    # -------------------------
+    # MAP TONEN
+    # -------------------------
+    # Alleen de highlightlaag verandert bij een andere selectie
+    st_folium(
+        m,
+        width=1500,
+        height=700,
+        feature_group_to_add=highlight_layer(routes_geojson, gekozen_route)
     )
-    df_route = df_route.drop_duplicates(subset = ['CO2 Rating Num', 'CO2 per passenger','AC Operator','Aircraft Variant','Engine Model'])
-    df_route['Actual Distance Flown (km)'] = df_route['Actual Distance Flown (km)'].round(2)
-    df_route['CO2 per passenger'] = df_route['CO2 per passenger'].round(2)
 
-    rows = len(df_route)
+with stage("route_table", kind="render", cached=True):
+    if gekozen_route != "No selection":
+        # Voorbereide tabel van de gekozen route
+        df_route = load_route_table(version, gekozen_route, vertrek_code, MAP_DISTANCE_KM)
 
-    row_height = 35          # px per rij (werkt goed)
-    header_height = 40       # px voor kolomheaders
-    max_height = 300         # maximale hoogte
+        rows = len(df_route)
 
-    height = min(
-        header_height + rows * row_height,
-        max_height
-    )
-    st.subheader(f"Flights ordered on environmental impact with route: {gekozen_route}")
-    st.dataframe(df_route[['AC Operator','AC Type','Aircraft Variant','Engine Model','Actual Distance Flown (km)', 'CO2 Rating','CO2 per passenger', 'Sustainability Rating' ]].reset_index(drop=True), height=height)
-else:
-    st.info("Select a flight to view the corresponding data.")
+        row_height = 35          # px per rij (werkt goed)
+        header_height = 40       # px voor kolomheaders
+        max_height = 300         # maximale hoogte
+
+        height = min(
+            header_height + rows * row_height,
+            max_height
+        )
+        st.subheader(f"Flights ordered on environmental impact with route: {gekozen_route}")
+        st.dataframe(df_route, height=height)
+    else:
+        st.info("Select a flight to view the corresponding data.")
 st.markdown("---")
 col1, col2 = st.columns([2, 1])
 with col1:
@@ -375,383 +418,155 @@ with col2:
     # Toon afbeelding in Streamlit
     st.image(image,  width = 300)
 
-tab1, tab2, tab3, tab4 = st.tabs(['✈️ Flight replacements','🛠️ Engines','🛫 Airlines','🛩️ Aircrafts'])
+# Alleen de open tab draait (on_change="rerun"); de grafieken komen kant
+# en klaar uit de cache
+tab1, tab2, tab3, tab4 = st.tabs(
+    ['✈️ Flight replacements','🛠️ Engines','🛫 Airlines','🛩️ Aircrafts'],
+    key="tab",
+    on_change="rerun"
+)
 with tab1:
-    st.header("Replacing flights with trains")
-    st.write("Note: These only contain flights departing from Schiphol under 500 km.")
-    st.subheader("Choose the route you would like to change from plane to train:")
-
-
-    bestemming = st.selectbox(
-        "Choose a destination:",
-        ["No selection"] + sorted(treinroutes.keys())
-    )
-    if bestemming != "No selection":
-
-        st.subheader(f"Trainroute to {bestemming}")
-
-        totale_km = 0
-        totale_co2 = 0
-        
-        for i, segment in enumerate(treinroutes[bestemming], start=1):
-            km = segment["km"]
-            vervoer = segment["vervoer"]
-            co2 = km * treinuitstoot[vervoer]
+    if tab1.open:
+        with stage("tab:flight_replacements", kind="render", cached=True):
+            st.header("Replacing flights with trains")
+            st.write(f"Note: These only contain flights departing from {vertrek} under 500 km.")
+            st.subheader("Choose the route you would like to change from plane to train:")
 
-            totale_km += km
-            totale_co2 += co2
 
-            st.markdown(
-                f"**Step {i}:** From **{segment['van']}** to **{segment['naar']}** "
-                f"with **{vervoer}** ({km} km) "
-                f"→ **{co2:.2f} kg CO₂**"
+            bestemming = st.selectbox(
+                "Choose a destination:",
+                ["No selection"] + sorted(dfuitstoot["Bestemming"])
             )
-
-
-        st.markdown("### Total journey")
-        st.markdown(f"- **Total distance:** {totale_km} km")
-        st.markdown(f"- **Total CO₂-emission:** *{totale_co2:.2f} kg CO₂*")
-    else:
-        st.info("Select a flight to view the corresponding train replacement.")
-
-    st.markdown("---")
-
-    flight = df_500.copy()
-    flightco2 = (
-        flight
-        .groupby("Bestemming")["Total CO2 Emissions (kg)"]
-        .mean()
-        ).reset_index()
-
-    flight = df_500.copy()
-    flightco2 = (
-    flight
-    .groupby("Bestemming")["CO2 per passenger"]
-    .mean()
-    ).reset_index()
-
-
-    st.subheader("Comparison CO2 emission of flights en train journeys")
-    st.write("Note: These only contain flights departing fro Schiphol under 500 km")
-    col1, col2 = st.columns(2)
-
-    with col1:
-
-        
-        fig_train = px.bar(
-            dfuitstoot,
-            x="Totale_CO2_kg",
-            y="Bestemming",
-            title="Train CO₂ emissions per passenger of each destination",
-            labels={
-                    "Bestemming": "Destination",
-                    "Totale_CO2_kg": "CO₂ emissions per passenger (kg/pass)"
-                },
-            color_discrete_sequence=["green"],
-        )
-
-        fig_train.update_layout(
-            template="plotly_white",
-            xaxis_tickangle=-45
+            if bestemming != "No selection":
+
+                st.subheader(f"Trainroute to {bestemming}")
+
+                # Uitstoot is al per segment berekend, hier alleen tonen
+                route = treinsegmenten[treinsegmenten["Bestemming"] == bestemming]
+                for segment in route.itertuples(index=False):
+                    st.markdown(
+                        f"**Step {segment.Stap}:** From **{segment.van}** to **{segment.naar}** "
+                        f"with **{segment.vervoer}** ({segment.km} km) "
+                        f"→ **{segment.CO2_kg:.2f} kg CO₂**"
+                    )
+
+                totaal = dfuitstoot[dfuitstoot["Bestemming"] == bestemming].iloc[0]
+                st.markdown("### Total journey")
+                st.markdown(f"- **Total distance:** {totaal['Totale_km']} km")
+                st.markdown(f"- **Total CO₂-emission:** *{totaal['Totale_CO2_kg']:.2f} kg CO₂*")
+            else:
+                st.info("Select a flight to view the corresponding train replacement.")
+
+            st.markdown("---")
+
+            st.subheader("Comparison CO2 emission of flights en train journeys")
+            st.write(f"Note: These only contain flights departing from {vertrek} under 500 km")
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.plotly_chart(load_figure(version, "train_co2", vertrek_code))
+
+            with col2:
+                st.plotly_chart(load_figure(version, "flight_co2", vertrek_code), use_container_width=True)
+
+            st.markdown("---")
+            st.subheader("What if every flight under a distance moved to rail?")
+            st.write("Note: Only destinations with a known train route count towards the savings.")
+
+            scenario = load_scenario(version, vertrek_code)
+            max_km = st.slider(
+                "Replace all flights under (km):",
+                min_value=0,
+                max_value=max_distance(scenario),
+                value=500,
+                step=10
             )
+            uitkomst = scenario_at(scenario, max_km)
 
-        st.plotly_chart(fig_train)
-
-    with col2:
-
-
-        fig_plane = px.bar(
-            flightco2,
-            x="CO2 per passenger",
-            y="Bestemming",
-            title="Flight CO₂ emissions per passenger of each destination",
-            labels={
-                "Bestemming": "Destination",
-                "Total CO2 Emissions (kg)": "CO₂ emissions per passenger (kg/pass)"
-            },
-            color_discrete_sequence=["red"]
-        )
-
-        fig_plane.update_layout(
-                xaxis_title = "CO₂ emissions per passenger (kg/pass)",
-                template="plotly_white",
-                xaxis_tickangle=-45
+            col1, col2, col3 = st.columns(3)
+            col1.metric(
+                "Flights replaced by train",
+                f"{uitkomst['matched_flights']:,.0f} / {uitkomst['flights']:,.0f}"
             )
-
-        st.plotly_chart(fig_plane, use_container_width=True)
-
+            col2.metric("Flight CO₂ of replaced flights", f"{uitkomst['matched_flight_co2']:,.0f} kg")
+            col3.metric("CO₂ saved", f"{uitkomst['co2_saved']:,.0f} kg")
 
 with tab2:
-    st.header("Engine Insights")
-    st.write("Note: This only contains flights departing from Schiphol.")
-    st.subheader("Which plane engines are the best for the environment?")
-
-
-    with st.expander("🌱 Click here to see the 3 best engine models for the environment"):
-        st.markdown("""
-    **The best engine models for the environment are:**
-
-    1. **PW1127G**
-    2. **V2527-A5**
-    3. **CFM56-LEAP-1A32**
-
-    This top 3 is determined by an **overall score** based on the **three main environmental metrics**.
-    """)
-
-    st.markdown("---")
-    dfeng = df_all.copy()
-    dfeng = (dfeng.groupby("Engine Model")[['CO2 Rating Num', 'CO2 per passenger', 'Sustainability rating num']].mean()).reset_index()
-    dfeng = dfeng[dfeng['Engine Model'] != "Unknown"]
-
-    dfeng = dfeng.sort_values('CO2 Rating Num', ascending = False)
-
-    fig_rating = px.bar(
-        dfeng,
-        x="Engine Model",
-        y="CO2 Rating Num",
-        color="CO2 Rating Num",
-        color_continuous_scale="RdYlGn",
-        labels={
-            "Engine Model":"Engine Model",
-            "CO2 Rating Num":"CO₂ Rating"
-        }
-    )
-
-
-
-    fig_rating.update_layout(
-        title = "Average CO2 rating of each Engine model",
-        yaxis_title = "CO2 Rating (higher = better)",
-        legend_title_text = "CO2 Rating",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_rating)
-
-    dfeng = dfeng.sort_values('CO2 per passenger', ascending = True)
-    fig_flow = px.bar(
-        dfeng,
-        x="Engine Model",
-        y='CO2 per passenger',
-        color='CO2 per passenger',
-        color_continuous_scale="RdYlGn_r",
-        labels={
-            "Engine Model":"Engine Model",
-            "CO2 per passenger":"CO2 emission"
-        }
-    )
-
-
+    if tab2.open:
+        with stage("tab:engines", kind="render", cached=True):
+            st.header("Engine Insights")
+            st.write(f"Note: This only contains flights departing from {vertrek}.")
+            st.subheader("Which plane engines are the best for the environment?")
+
+            with st.expander(f"🌱 Click here to see the {top_k} best engine models for the environment"):
+                st.markdown(top_k_markdown(
+                    load_ranking(version, "Engine Model", vertrek_code, top_k, gewichten, min_vluchten),
+                    "engine models"
+                ))
+
+            st.markdown("---")
+            for naam in TAB_FIGURES["engines"]:
+                st.plotly_chart(load_figure(version, naam, vertrek_code))
 
-    fig_flow.update_layout(
-        title = "Average CO2 emission per passenger in take off of each engine model",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_flow)
-
-    dfeng = dfeng.sort_values('Sustainability rating num', ascending = False)
-    fig_sus = px.bar(
-        dfeng,
-        x="Engine Model",
-        y='Sustainability rating num',
-        color='Sustainability rating num',
-        color_continuous_scale="RdYlGn",
-        labels={
-            "Engine Model":"Engine Model",
-            'Sustainability rating num':"Sustainability rating"
-        }
-    )
-
-
-
-    fig_sus.update_layout(
-        title = "Average sustainability rating of each engine model",
-        yaxis_title = "Sustainability rating (higher = better)",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_sus)
-
-
-# Laatste 2 Tabs!!
 with tab3:
-    st.header("Airliner insights")
-    st.write("Note: This only contains flights departing from Schiphol.")
-    st.subheader("Which Aircraft operator are the best for the environment?")
-
-    with st.expander("🌱 Click here to see the 3 best airlines for the environment"):
-        st.markdown("""
-    **The best airlines for the environment are:**
-
-    1. **Vueling Airlines**
-    2. **Pegasus Airlines**
-    3. **easyjet Switzerland**
-
-    This top 3 is determined by an **overall score** based on the **three main environmental metrics**.
-    """)
-       
-    st.markdown("---") 
-
-    dfairl = df_all.copy()
-    dfairl = dfairl.dropna(subset = ['AC Operator'])
-    dfairlsc = (dfairl.groupby('AC Operator')[['CO2 Rating Num', 'CO2 per passenger','Sustainability rating num' ]].mean()).reset_index()
-
-    dfairlc = dfairlsc.sort_values('CO2 Rating Num', ascending = False)
-    fig_rating = px.bar(
-        dfairlc,
-        x="AC Operator",
-        y='CO2 Rating Num',
-        color='CO2 Rating Num',
-        color_continuous_scale="RdYlGn",
-        labels={
-            "AC Operator":"Aircraft operator",
-            "CO2 Rating Num":"CO₂ Rating"
-        }
-    )
-    fig_rating.update_layout(
-        title = "Average CO2 rating of each aircraft operator",
-        yaxis_title = "CO2 Rating (hoger = beter)",
-        legend_title_text = "CO2 Rating",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_rating)
-
-    dfairlc = dfairlsc.sort_values('CO2 per passenger', ascending = True)
-    fig_rating = px.bar(
-        dfairlc,
-        x="AC Operator",
-        y='CO2 per passenger',
-        color='CO2 per passenger',
-        color_continuous_scale="RdYlGn_r",
-        labels={
-            "AC Operator":"Aircraft operator",
-            "CO2 per passenger":"CO₂ emission (kg/pass)"
-        }
-    )
-    fig_rating.update_layout(
-        title = "Average CO2 emission per passenger of each aircraft operator",
-        yaxis_title = "CO2 emission (kg/pass)",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_rating)
-
-    dfairlc = dfairlsc.sort_values('Sustainability rating num', ascending = False)
-    fig_sus = px.bar(
-        dfairlc,
-        x="AC Operator",
-        y='Sustainability rating num',
-        color='Sustainability rating num',
-        color_continuous_scale="RdYlGn",
-        labels={
-            "AC Operator":"Aircraft operator",
-            'Sustainability rating num':"Sustainability rating"
-        }
-    )
-
-    st.markdown("---") 
-
-    fig_sus.update_layout(
-        title = "Average sustainability rating of each aircraft operator",
-        yaxis_title = "Sustainability rating (higher = better)",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_sus)
+    if tab3.open:
+        with stage("tab:airlines", kind="render", cached=True):
+            st.header("Airliner insights")
+            st.write(f"Note: This only contains flights departing from {vertrek}.")
+            st.subheader("Which Aircraft operator are the best for the environment?")
+
+            with st.expander(f"🌱 Click here to see the {top_k} best airlines for the environment"):
+                st.markdown(top_k_markdown(
+                    load_ranking(version, "AC Operator", vertrek_code, top_k, gewichten, min_vluchten),
+                    "airlines"
+                ))
+
+            st.markdown("---")
+            st.plotly_chart(load_figure(version, "operator_co2_rating", vertrek_code))
+            st.plotly_chart(load_figure(version, "operator_co2_passenger", vertrek_code))
+            st.markdown("---")
+            st.plotly_chart(load_figure(version, "operator_sustainability", vertrek_code))
 
 with tab4:
-    st.header("Aircraft insights")
-    st.write("Note: This only contains flights departing from Schiphol.")
-    st.subheader("Which Aircrafts are the best for the environment?")
+    if tab4.open:
+        with stage("tab:aircrafts", kind="render", cached=True):
+            st.header("Aircraft insights")
+            st.write(f"Note: This only contains flights departing from {vertrek}.")
+            st.subheader("Which Aircrafts are the best for the environment?")
 
-    with st.expander("🌱 Click here to see the 3 best aircraft variants for the environment"):
-        st.markdown("""
-    **The best engines for the environment are:**
+            with st.expander(f"🌱 Click here to see the {top_k} best aircraft variants for the environment"):
+                st.markdown(top_k_markdown(
+                    load_ranking(version, "Aircraft Variant", vertrek_code, top_k, gewichten, min_vluchten),
+                    "aircraft variants"
+                ))
 
-    1. **A320neo**
-    2. **A220-300**
-    3. **A321neo ACF**
+            for naam in TAB_FIGURES["aircrafts"]:
+                st.plotly_chart(load_figure(version, naam, vertrek_code))
 
-    This top 3 is determined by an **overall score** based on the **three main environmental metrics**.
-    """)
-        
-    
-    dffull = df_all.copy()
-    dfvar = (
-    dffull
-    .groupby("Aircraft Variant")[['CO2 Rating Num','CO2 per passenger', 'Sustainability rating num' ]].mean()
-    ).reset_index()
-    
-    dfvar = dfvar[dfvar['Aircraft Variant'] != "Unknown"]
-
-    dfvar = dfvar.sort_values('CO2 Rating Num', ascending = False)
-
-    fig_rating = px.bar(
-        dfvar,
-        x="Aircraft Variant",
-        y="CO2 Rating Num",
-        color="CO2 Rating Num",
-        color_continuous_scale="RdYlGn",
-        labels={
-            "Aircraft Viarant":"Aircraft Variant",
-            "CO2 Rating Num":"CO₂ Rating"
-        }
-    )
-
-
-
-    fig_rating.update_layout(
-        title = " Average CO2 rating of each aircraft variant",
-        yaxis_title = "CO2 rating (hoger is beter)",
-        legend_title_text = "CO2 Rating",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-
-    st.plotly_chart(fig_rating)
-
-    dfvar = dfvar.sort_values("CO2 per passenger", ascending = True)
-    fig_passenger = px.bar(
-        dfvar,
-        x="Aircraft Variant",
-        y="CO2 per passenger",
-        title="Average CO₂ per passenger of each Aircraft vairant",
-        labels={
-            "AC Type": "Aircraft Variant",
-            "CO2 per passenger": "CO₂ Emission"
-        },
-        color="CO2 per passenger",               
-        color_continuous_scale="RdYlGn_r"
-    )
-
-    fig_passenger.update_layout(
-        yaxis_title = "CO2 Emission per passenger (kg/pass)",
-        xaxis_tickangle=-45,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_passenger)
-
-
-    
-    dfvar = dfvar.sort_values("Sustainability rating num", ascending = False)
-    fig_passenger = px.bar(
-        dfvar,
-        x="Aircraft Variant",
-        y="Sustainability rating num",
-        title="Average sustainability rating of each Aircraft variant",
-        labels={
-            "AC Type": "Aircraft Variant",
-            "Sustainability rating num": "Sustainability rating"
-        },
-        color="Sustainability rating num",               
-        color_continuous_scale="RdYlGn"
+# -------------------------
+# Diagnostics
+# -------------------------
+if st.sidebar.checkbox("Show diagnostics"):
+    st.sidebar.subheader("Diagnostics")
+    st.sidebar.caption(
+        "Stages of this run; cache = hit/miss of the shared caches. "
+        "Memory is the RSS of the whole server process: rss_mb at the end of the "
+        "stage, rss_delta_mb from start to end and rss_peak_delta_mb from start "
+        "to the highest sample in between. Other sessions and the warm-up count too."
     )
-
-    fig_passenger.update_layout(
-        yaxis_title = "Sustainability rating (higher = better)",
-        xaxis_tickangle=-45,
-        template="plotly_white"
+    if warm_status["ready"].is_set():
+        st.sidebar.caption(
+            f"Warm-up of {warm_status['origin']}: done in {warm_status['seconds']} s"
+            + (f", failed with {warm_status['error']}" if warm_status["error"] else "")
+        )
+    kolommen = ["stage", "kind", "cache", "seconds", "rows_in", "rows_out",
+                "rss_mb", "rss_delta_mb", "rss_peak_delta_mb"]
+    st.sidebar.dataframe(
+        pd.DataFrame(run_records()).reindex(columns=kolommen),
+        hide_index=True
     )
-    st.plotly_chart(fig_passenger)
\ No newline at end of file
+    with st.sidebar.expander("Recent stages of this process"):
+        st.caption("Newest first, across all sessions and the warm-up thread.")
+        recent = pd.DataFrame(recent_records()).reindex(columns=["timestamp"] + kolommen)
+        recent["timestamp"] = pd.to_datetime(recent["timestamp"], unit="s")
+        st.dataframe(recent, hide_index=True)
@@ -0,0 +1,43 @@
+import pandas as pd
+
+METRICS = ["CO2 Rating Num", "CO2 per passenger", "Sustainability rating num"]
+STATS = ["count", "sum", "mean"]
+QUANTILES = [0.25, 0.5, 0.75]
+
+# Dimensies (en combinaties) waarop de tabs groeperen
+CUBE_DIMENSIONS = [
+    ("Engine Model",),
+    ("AC Operator",),
+    ("Aircraft Variant",),
+    ("Bestemming",),
+    ("AC Operator", "Aircraft Variant"),
+    ("Aircraft Variant", "Engine Model"),
+    ("AC Operator", "Aircraft Variant", "Engine Model"),
+    ("Bestemming", "AC Operator"),
+]
+
+def aggregate(df, dims, metrics=METRICS):
+    # Ratings zijn compacte int8 codes, de statistieken worden gewone floats
+    values = df[list(dims)].assign(**{m: df[m].astype("float64") for m in metrics})
+    grouped = values.groupby(list(dims), observed=True)[metrics]
+
+    # count/sum/mean in één aggregatie, kwantielen apart en daarna naast
+    # elkaar als (metric, stat) kolommen
+    stats = grouped.agg(STATS)
+    # De kolommen liggen vast, ook als er geen groepen zijn
+    quantiles = grouped.quantile(QUANTILES).unstack().reindex(
+        columns=pd.MultiIndex.from_product([metrics, QUANTILES])
+    )
+    quantiles.columns = pd.MultiIndex.from_product(
+        [metrics, [f"q{int(q * 100)}" for q in QUANTILES]]
+    )
+    return pd.concat([stats, quantiles], axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+
+def build_cube(df, dimensions=CUBE_DIMENSIONS, metrics=METRICS):
+    return {dims: aggregate(df, dims, metrics) for dims in dimensions}
+
+def cube_stat(cube, dims, stat="mean"):
+    # Eén statistiek per metric als platte tabel, zoals groupby().mean()
+    if isinstance(dims, str):
+        dims = (dims,)
+    return cube[tuple(dims)].xs(stat, axis=1, level=1).reset_index()
@@ -0,0 +1,291 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from aggregates import build_cube, cube_stat
+from pipeline import (
+    FLIGHTS_SOURCE,
+    ORIGIN,
+    ORIGINS,
+    build_route_tables,
+    dataset_version,
+    distance_view,
+    load_prepared,
+    origin_name,
+)
+from rail import origin_station, rail_routes, route_totals, score_segments, segment_table
+from ranking import WEIGHTS, rank
+
+logger = logging.getLogger("aviation.api")
+
+# -------------------------
+# JSON API
+# -------------------------
+# Alleen lezen, op dezelfde voorbereide tabellen als het dashboard. Alles
+# is gecached op datasetversie: de tabellen per luchthaven, de afgeleide
+# views en de gecodeerde antwoorden in een begrensde LRU. De ETag is de
+# datasetversie, dus een client met een actuele kopie krijgt een 304
+# zonder dat er iets berekend wordt.
+#
+#   GET /origins
+#   GET /routes?origin=EHAM&max_distance_km=500
+#   GET /route?origin=EHAM&route=Schiphol → Brussels&max_distance_km=500
+#   GET /trains?origin=EHAM&max_distance_km=500
+#   GET /ranking?origin=EHAM&dim=Engine Model&k=3&min_count=1
+
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+ORIGIN_ENTRIES = 4
+VIEW_ENTRIES = 32
+RESPONSE_ENTRIES = 4096
+# Hoe lang een datasetversie geldt voordat de bestanden opnieuw bekeken worden
+VERSION_TTL = 1.0
+RANKING_DIMENSIONS = ["Engine Model", "AC Operator", "Aircraft Variant"]
+
+_version = {"value": None, "checked": 0.0}
+_version_lock = threading.Lock()
+
+def current_version(source=FLIGHTS_SOURCE):
+    # Niet bij elk request alle invoerbestanden stat'en
+    now = time.monotonic()
+    with _version_lock:
+        if _version["value"] is None or now - _version["checked"] > VERSION_TTL:
+            _version["value"] = dataset_version(source)
+            _version["checked"] = now
+        return _version["value"]
+
+# -------------------------
+# Gedeelde tabellen
+# -------------------------
+# lru_cache kan bij gelijktijdige misses dubbel rekenen. build_once houdt
+# per key een lock vast tijdens het bouwen: de zware stappen draaien één
+# keer en alleen requests voor dezelfde key wachten op het resultaat. Een
+# hit raakt alleen de korte lock van de LRU administratie.
+
+def build_once(maxsize):
+    def decorator(build):
+        cache = OrderedDict()
+        building = {}
+        guard = threading.Lock()
+
+        @wraps(build)
+        def cached(*key):
+            with guard:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+                lock = building.setdefault(key, threading.Lock())
+            with lock:
+                with guard:
+                    # Intussen door een andere thread gebouwd
+                    if key in cache:
+                        return cache[key]
+                try:
+                    value = build(*key)
+                    with guard:
+                        cache[key] = value
+                        while len(cache) > maxsize:
+                            cache.popitem(last=False)
+                finally:
+                    with guard:
+                        if building.get(key) is lock:
+                            del building[key]
+            return value
+        return cached
+    return decorator
+
+@build_once(maxsize=ORIGIN_ENTRIES)
+def _prepared(version, origin, source):
+    return load_prepared(source, origin)
+
+@build_once(maxsize=VIEW_ENTRIES)
+def _view(version, origin, max_distance_km, source):
+    dfmerge = _prepared(version, origin, source)
+    if dfmerge.empty:
+        return None
+    nearby = distance_view(dfmerge, max_distance_km)
+    segments = score_segments(segment_table(
+        rail_routes(nearby["Bestemming"].dropna().unique(), origin=origin_station(origin))
+    ))
+    return {
+        "route_tables": build_route_tables(nearby),
+        "cube": build_cube(nearby),
+        "train_totals": route_totals(segments),
+    }
+
+def view(version, origin, max_distance_km, source=FLIGHTS_SOURCE):
+    if origin not in ORIGINS:
+        raise KeyError(f"Unknown origin: {origin}")
+    result = _view(version, origin, max_distance_km, source)
+    # Zoals de melding van het dashboard; zonder korte vluchten zijn de
+    # resultaten wel gewoon leeg
+    if result is None:
+        raise KeyError(f"No flights departing from {origin_name(origin)} ({origin})")
+    return result
+
+# -------------------------
+# Endpoints
+# -------------------------
+
+def records(df):
+    return df.to_json(orient="records", force_ascii=False)
+
+def param(params, name, default=None, cast=str):
+    if name not in params:
+        if default is None:
+            raise ValueError(f"Missing parameter: {name}")
+        return default
+    try:
+        return cast(params[name])
+    except ValueError:
+        raise ValueError(f"Invalid value for {name}: {params[name]!r}") from None
+
+def distance_param(params):
+    # Standaard 500 km zoals op de kaart; "none" is zonder afstandsgrens
+    if params.get("max_distance_km", "").lower() == "none":
+        return None
+    return param(params, "max_distance_km", 500, float)
+
+def get_origins(version, params, source):
+    return json.dumps(
+        [{"code": code, "name": origin_name(code)} for code in ORIGINS],
+        ensure_ascii=False,
+    )
+
+def get_routes(version, params, source):
+    v = view(version, param(params, "origin", ORIGIN), distance_param(params), source)
+    return json.dumps(list(v["route_tables"]), ensure_ascii=False)
+
+def get_route(version, params, source):
+    v = view(version, param(params, "origin", ORIGIN), distance_param(params), source)
+    route = param(params, "route")
+    if route not in v["route_tables"]:
+        raise KeyError(f"Unknown route: {route}")
+    return records(v["route_tables"][route])
+
+def get_trains(version, params, source):
+    # Trein- en vlucht CO₂ per passagier per bestemming, None zonder spoor
+    v = view(version, param(params, "origin", ORIGIN), distance_param(params), source)
+    flights = cube_stat(v["cube"], "Bestemming")[["Bestemming", "CO2 per passenger"]]
+    flights = flights.assign(Bestemming=flights["Bestemming"].astype(str))
+    table = flights.rename(columns={"CO2 per passenger": "Flight_CO2_kg"}).merge(
+        v["train_totals"].rename(columns={"Totale_CO2_kg": "Train_CO2_kg"}),
+        on="Bestemming", how="left",
+    )
+    return records(table)
+
+def get_ranking(version, params, source):
+    origin = param(params, "origin", ORIGIN)
+    dim = param(params, "dim")
+    if dim not in RANKING_DIMENSIONS:
+        raise KeyError(f"Unknown dimension: {dim}")
+    k = param(params, "k", 3, int)
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    v = view(version, origin, None, source)
+    ranking = rank(
+        v["cube"], dim,
+        k=k,
+        weights={m: param(params, m, w, float) for m, w in WEIGHTS.items()},
+        min_count=param(params, "min_count", 1, int),
+    )
+    return json.dumps(
+        [{"name": str(name), "score": float(score)} for name, score in ranking.items()],
+        ensure_ascii=False,
+    )
+
+ENDPOINTS = {
+    "/origins": get_origins,
+    "/routes": get_routes,
+    "/route": get_route,
+    "/trains": get_trains,
+    "/ranking": get_ranking,
+}
+
+@lru_cache(maxsize=RESPONSE_ENTRIES)
+def response(version, path, query, source=FLIGHTS_SOURCE):
+    # Gecodeerd antwoord per (versie, pad, gesorteerde parameters); een hit
+    # is alleen nog socket schrijven. Fouten worden niet gecached.
+    return ENDPOINTS[path](version, dict(query), source).encode("utf-8")
+
+# -------------------------
+# HTTP server
+# -------------------------
+
+class ApiHandler(BaseHTTPRequestHandler):
+    # Keep-alive, zodat een client niet per request een verbinding opent;
+    # zonder Nagle wachten headers en body niet op elkaars ACK
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        if path not in ENDPOINTS:
+            self.send_error_json(404, f"Unknown endpoint: {path}")
+            return
+
+        # Pas na het pad: een onbekend endpoint is nooit "not modified"
+        version = current_version(self.server.source)
+        etag = f'"{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, b"", etag)
+            return
+
+        query = tuple(sorted(parse_qsl(url.query, keep_blank_values=True)))
+        try:
+            body = response(version, path, query, self.server.source)
+        except KeyError as e:
+            self.send_error_json(404, e.args[0] if e.args else str(e))
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+        except Exception:
+            logger.exception("Request failed: %s", self.path)
+            self.send_error_json(500, "Internal error")
+        else:
+            self.send_body(200, body, etag)
+
+    def send_body(self, status, body, etag=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_body(status, json.dumps({"error": message}, ensure_ascii=False).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+def make_server(host=API_HOST, port=API_PORT, source=FLIGHTS_SOURCE):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.source = source
+    return server
+
+def serve(host=API_HOST, port=API_PORT, source=FLIGHTS_SOURCE, origins=(ORIGIN,)):
+    # De gevraagde luchthavens vooraf laden, zodat het eerste request niet wacht
+    version = current_version(source)
+    for origin in origins:
+        view(version, origin, 500, source)
+        view(version, origin, None, source)
+
+    server = make_server(host, port, source)
+    logger.info("Serving on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,220 @@
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import SUSTAINABILITY_CSV, RATINGS  # noqa: E402
+
+# Echte luchthavens eerst, zodat de treinroutes en kaart iets opleveren
+ORIGINS = [
+    ("EHAM", 52.3086, 4.7639),
+    ("EHEH", 51.4501, 5.3745),
+    ("EHRD", 51.9569, 4.4372),
+    ("EBBR", 50.9014, 4.4844),
+]
+DESTINATIONS = [
+    ("EBBR", "Brussels", 50.9014, 4.4844),
+    ("EDDH", "Hamburg", 53.6304, 9.9882),
+    ("LFPG", "Paris", 49.0097, 2.5479),
+    ("EGLL", "London", 51.4700, -0.4543),
+    ("EDDL", "Düsseldorf", 51.2895, 6.7668),
+    ("EDDF", "Frankfurt", 50.0379, 8.5622),
+    ("EDDV", "Hanover", 52.4611, 9.6851),
+    ("EDDW", "Bremen", 53.0475, 8.7867),
+    ("EKBI", "Billund", 55.7403, 9.1518),
+    ("EGBB", "Birmingham", 52.4539, -1.7480),
+    ("ELLX", "Luxembourg", 49.6233, 6.2044),
+    ("LEMD", "Madrid", 40.4983, -3.5676),
+    ("LIRF", "Rome", 41.8003, 12.2389),
+    ("LOWW", "Vienna", 48.1103, 16.5697),
+    ("EKCH", "Copenhagen", 55.6180, 12.6508),
+    ("ESSA", "Stockholm", 59.6498, 17.9238),
+    ("LPPT", "Lisbon", 38.7742, -9.1342),
+    ("LGAV", "Athens", 37.9364, 23.9445),
+    ("EPWA", "Warsaw", 52.1657, 20.9671),
+    ("LSZH", "Zurich", 47.4582, 8.5555),
+]
+OPERATORS = ["KLM", "TRA", "EZS", "VLG", "PGT", "DLH", "BAW", "AFR", "RYR", "SWR"]
+AIRCRAFT = [
+    ("A20N", "A320neo", "PW1127G"),
+    ("A320", "A320-200", "V2527-A5"),
+    ("A21N", "A321neo ACF", "CFM56-LEAP-1A32"),
+    ("BCS3", "A220-300", "PW1524G"),
+    ("B738", "737-800", "CFM56-7B26"),
+    ("E190", "E190", "CF34-10E"),
+    ("B77W", "777-300ER", "GE90-115B"),
+]
+MISSING_COLUMNS = [
+    "Engine Model", "Aircraft Variant", "Total CO2 Emissions (kg)",
+    "CO2 Rating", "Sustainability Rating", "Sustainability Score",
+]
+MONTHS = [
+    "20230101-20230201", "20230201-20230301", "20230301-20230401",
+    "20230401-20230501", "20230501-20230601", "20230601-20230701",
+    "20230701-20230801", "20230801-20230901", "20230901-20231001",
+    "20231001-20231101", "20231101-20231201", "20231201-20240101",
+]
+CHUNK_ROWS = 1_000_000
+
+def airports(n_origins, n_destinations, rng):
+    origins = pd.DataFrame(ORIGINS[:n_origins], columns=["code", "lat", "lon"])
+    destinations = pd.DataFrame(
+        DESTINATIONS[:n_destinations], columns=["code", "name", "lat", "lon"]
+    )
+
+    # Meer bestemmingen dan echte luchthavens: willekeurige plekken in Europa
+    extra = n_destinations - len(destinations)
+    if extra > 0:
+        destinations = pd.concat([destinations, pd.DataFrame({
+            "code": [f"X{i:03d}" for i in range(extra)],
+            "name": [f"Destination {i:03d}" for i in range(extra)],
+            "lat": rng.uniform(36, 62, extra),
+            "lon": rng.uniform(-10, 30, extra),
+        })], ignore_index=True)
+    return origins, destinations
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 6371 * 2 * np.arcsin(np.sqrt(a))
+
+def flight_chunk(n, origins, destinations, rng):
+    o = rng.integers(0, len(origins), n)
+    d = rng.integers(0, len(destinations), n)
+    distance = haversine_km(
+        origins["lat"].to_numpy()[o], origins["lon"].to_numpy()[o],
+        destinations["lat"].to_numpy()[d], destinations["lon"].to_numpy()[d],
+    )
+    return pa.table({
+        "ECTRL ID": rng.integers(200_000_000, 300_000_000, n),
+        "ADEP": origins["code"].to_numpy()[o],
+        "ADEP Latitude": origins["lat"].to_numpy()[o],
+        "ADEP Longitude": origins["lon"].to_numpy()[o],
+        "ADES": destinations["code"].to_numpy()[d],
+        "NAME_ADES": destinations["name"].to_numpy()[d],
+        "ADES Latitude": destinations["lat"].to_numpy()[d],
+        "ADES Longitude": destinations["lon"].to_numpy()[d],
+        "AC Type": rng.choice([a[0] for a in AIRCRAFT], n),
+        "AC Operator": rng.choice(OPERATORS, n),
+        "Actual Distance Flown (nm)": distance * rng.uniform(1.0, 1.1, n) / 1.852,
+    })
+
+def sustainability_chunk(n, origins, destinations, missing_rate, rng):
+    o = rng.integers(0, len(origins), n)
+    d = rng.integers(0, len(destinations), n)
+    a = rng.integers(0, len(AIRCRAFT), n)
+    distance = haversine_km(
+        origins["lat"].to_numpy()[o], origins["lon"].to_numpy()[o],
+        destinations["lat"].to_numpy()[d], destinations["lon"].to_numpy()[d],
+    ) * rng.uniform(1.0, 1.1, n) + 20
+    per_passenger = rng.uniform(0.04, 0.2, n)
+
+    df = pd.DataFrame({
+        "ADEP": origins["code"].to_numpy()[o],
+        "ADES": destinations["code"].to_numpy()[d],
+        "AC Operator": rng.choice(OPERATORS, n),
+        "AC Type": np.array([x[0] for x in AIRCRAFT])[a],
+        "Aircraft Variant": np.array([x[1] for x in AIRCRAFT])[a],
+        "Engine Model": np.array([x[2] for x in AIRCRAFT])[a],
+        "Jet Engine type": "Turbofan",
+        "ADEP Latitude": origins["lat"].to_numpy()[o],
+        "ADEP Longitude": origins["lon"].to_numpy()[o],
+        "ADES Latitude": destinations["lat"].to_numpy()[d],
+        "ADES Longitude": destinations["lon"].to_numpy()[d],
+        "Actual Distance Flown (km)": distance,
+        "Total CO2 Emissions (kg)": per_passenger * distance * rng.integers(80, 220, n),
+        "CO2 per Passenger (kg/km/passenger)": per_passenger,
+        "CO2 per FC seat (kg/km/seat)": per_passenger * 0.9,
+        "CO2 per PEC seat (kg/km/seat)": per_passenger * 0.8,
+        "CO2 Rating": rng.choice(RATINGS, n),
+        "Sustainability Rating": rng.choice(RATINGS, n),
+        "Sustainability Score": rng.uniform(0, 100, n),
+    })
+    for col in MISSING_COLUMNS:
+        df.loc[rng.random(n) < missing_rate, col] = np.nan
+    return df
+
+def generate(
+    output,
+    flight_rows=100_000,
+    sustainability_rows=50_000,
+    months=2,
+    n_origins=1,
+    n_destinations=20,
+    missing_rate=0.05,
+    seed=0,
+):
+    rng = np.random.default_rng(seed)
+    os.makedirs(output, exist_ok=True)
+    origins, destinations = airports(n_origins, n_destinations, rng)
+
+    # Per maand in blokken schrijven, zodat 50M rijen niet in het geheugen
+    # hoeven te passen
+    per_month = math.ceil(flight_rows / months)
+    paths = []
+    for month in MONTHS[:months]:
+        path = os.path.join(output, f"flights_hackaton_{month}.parquet")
+        writer = None
+        remaining = per_month
+        while remaining > 0:
+            chunk = flight_chunk(min(CHUNK_ROWS, remaining), origins, destinations, rng)
+            if writer is None:
+                writer = pq.ParquetWriter(path, chunk.schema)
+            writer.write_table(chunk, row_group_size=128_000)
+            remaining -= chunk.num_rows
+        writer.close()
+        paths.append(path)
+
+    csv_path = os.path.join(output, SUSTAINABILITY_CSV)
+    remaining = sustainability_rows
+    header = True
+    while remaining > 0:
+        n = min(CHUNK_ROWS, remaining)
+        sustainability_chunk(n, origins, destinations, missing_rate, rng).to_csv(
+            csv_path, mode="w" if header else "a", header=header, index=False
+        )
+        header = False
+        remaining -= n
+    return paths + [csv_path]
+
+def add_arguments(parser):
+    parser.add_argument("--flight-rows", type=int, default=100_000)
+    parser.add_argument("--sustainability-rows", type=int, default=50_000)
+    parser.add_argument("--months", type=int, default=2, choices=range(1, len(MONTHS) + 1))
+    parser.add_argument("--origins", type=int, default=1, choices=range(1, len(ORIGINS) + 1))
+    parser.add_argument("--destinations", type=int, default=20)
+    parser.add_argument("--missing-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+
+def generate_from_args(output, args):
+    return generate(
+        output,
+        flight_rows=args.flight_rows,
+        sustainability_rows=args.sustainability_rows,
+        months=args.months,
+        n_origins=args.origins,
+        n_destinations=args.destinations,
+        missing_rate=args.missing_rate,
+        seed=args.seed,
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic flight data")
+    parser.add_argument("output")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    for path in generate_from_args(args.output, args):
+        print(path)
+
+if __name__ == "__main__":
+    main()
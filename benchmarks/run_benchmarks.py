@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+from aggregates import build_cube  # noqa: E402
+from generate_data import add_arguments, generate_from_args  # noqa: E402
+from maps import base_map, route_geojson  # noqa: E402
+from rail import (  # noqa: E402
+    rail_routes,
+    route_totals,
+    score_segments,
+    segment_table,
+    shortest_path_tree,
+)
+from scenario import build_scenario  # noqa: E402
+
+@contextmanager
+def measure(results, memory, stage, rows_in=None):
+    # Wandkloktijd en wat Arrow buiten Python om heeft gealloceerd. Met
+    # memory het piekgeheugen van Python/numpy (tracemalloc); dat vertraagt
+    # elke allocatie, dus de tijden van zo'n run tellen niet.
+    record = {"stage": stage, "rows_in": rows_in, "rows_out": None}
+    arrow_before = pa.total_allocated_bytes()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        if memory:
+            record["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 3)
+            tracemalloc.stop()
+        record["arrow_mb"] = round((pa.total_allocated_bytes() - arrow_before) / 1e6, 3)
+        results.append(record)
+        if memory:
+            print(f"{stage:<28} {record['peak_mb']:>9.1f} MB peak", file=sys.stderr)
+        else:
+            print(f"{stage:<28} {record['seconds']:>9.3f}s", file=sys.stderr)
+
+def run_stages(source=pipeline.FLIGHTS_SOURCE, max_distance_km=500, memory=False):
+    results = []
+
+    # -------------------------
+    # load_and_prepare_flights
+    # -------------------------
+    with measure(results, memory, "load_flights") as r:
+        df_fl = pipeline.load_flights(source)
+        r["rows_out"] = len(df_fl)
+
+    with measure(results, memory, "read_sustainability") as r:
+        dftest = pipeline.read_sustainability()
+        r["rows_out"] = len(dftest)
+
+    with measure(results, memory, "build_destination_dim", len(df_fl)) as r:
+        dim = pipeline.build_destination_dim(df_fl, dftest)
+        r["rows_out"] = len(dim)
+
+    with measure(results, memory, "merge_destinations", len(dftest)) as r:
+        dfmerge = pipeline.merge_destinations(dftest, dim)
+        r["rows_out"] = len(dfmerge)
+
+    with measure(results, memory, "impute_by_group", len(dfmerge)) as r:
+        dfmerge = pipeline.impute_by_group(dfmerge, "Bestemming")
+        r["rows_out"] = len(dfmerge)
+
+    with measure(results, memory, "finish_prepared", len(dfmerge)) as r:
+        dfmerge = pipeline.finish_prepared(dfmerge)
+        r["rows_out"] = len(dfmerge)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        path = os.path.join(cache_dir, "flights.arrow")
+        with measure(results, memory, "disk_cache_write", len(dfmerge)):
+            pipeline.write_arrow(dfmerge, path)
+        with measure(results, memory, "disk_cache_read") as r:
+            r["rows_out"] = len(pipeline.read_arrow(path))
+
+    with measure(results, memory, "distance_view", len(dfmerge)) as r:
+        df_short = pipeline.distance_view(dfmerge, max_distance_km)
+        r["rows_out"] = len(df_short)
+
+    # -------------------------
+    # treinroutes
+    # -------------------------
+    with measure(results, memory, "treinroutes") as r:
+        segments = score_segments(segment_table(
+            rail_routes(dfmerge["Bestemming"].dropna().unique())
+        ))
+        totals = route_totals(segments)
+        r["rows_out"] = len(segments)
+
+    # -------------------------
+    # Tab aggregaties
+    # -------------------------
+    with measure(results, memory, "aggregate_cube", len(dfmerge)) as r:
+        cube = build_cube(dfmerge)
+        r["rows_out"] = sum(len(table) for table in cube.values())
+
+    with measure(results, memory, "route_tables", len(df_short)) as r:
+        r["rows_out"] = len(pipeline.build_route_tables(df_short))
+
+    with measure(results, memory, "scenario", len(dfmerge)) as r:
+        scenario = build_scenario(dfmerge, totals)
+        r["rows_out"] = len(scenario["distance"])
+
+    # -------------------------
+    # Kaart
+    # -------------------------
+    with measure(results, memory, "route_map", len(df_short)) as r:
+        geojson = route_geojson(df_short)
+        html = base_map(geojson).get_root().render()
+        r["rows_out"] = len(geojson["features"])
+        r["html_bytes"] = len(html)
+
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "pipeline_version": pipeline.PIPELINE_VERSION,
+    }
+
+def compare(results, baseline):
+    # Verhouding nieuwe/oude tijd per stage, > 1 is trager geworden
+    old = {r["stage"]: r for r in baseline["results"]}
+    for record in results:
+        before = old.get(record["stage"])
+        if before and before["seconds"] > 0:
+            ratio = record["seconds"] / before["seconds"]
+            print(f"{record['stage']:<28} {ratio:>6.2f}x", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages")
+    parser.add_argument(
+        "--data", help="Existing data directory; generated synthetically if omitted"
+    )
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--max-distance-km", type=float, default=500)
+    parser.add_argument(
+        "--memory", action="store_true",
+        help="Also measure the peak memory per stage, in a separate run"
+    )
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = args.data or tmp
+        if not args.data:
+            start = time.perf_counter()
+            generate_from_args(data, args)
+            print(f"generated data in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        # De pipeline leest relatief aan de werkmap
+        cwd = os.getcwd()
+        os.chdir(data)
+        try:
+            results = run_stages(max_distance_km=args.max_distance_km)
+            if args.memory:
+                # Tweede run met tracemalloc, weer met een koude spoorcache;
+                # alleen de pieken worden overgenomen
+                shortest_path_tree.cache_clear()
+                peaks = run_stages(max_distance_km=args.max_distance_km, memory=True)
+                for record, peak in zip(results, peaks):
+                    record["peak_mb"] = peak["peak_mb"]
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "compare")
+        },
+        "environment": environment(),
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
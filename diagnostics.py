@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("aviation.diagnostics")
+
+# Hoe vaak de RSS van open stages bemonsterd wordt; een kortere stage heeft
+# alleen de meting bij begin en eind
+RSS_SAMPLE_SECONDS = 0.01
+PAGE_MB = os.sysconf("SC_PAGE_SIZE") / 1e6 if hasattr(os, "sysconf") else None
+
+# Laatste metingen van het hele proces, en per run (thread) die van de
+# huidige Streamlit run
+RECENT = deque(maxlen=1000)
+_local = threading.local()
+
+# Hoogste bemonsterde RSS per open stage
+_open_peaks = {}
+_open_lock = threading.Lock()
+_busy = threading.Event()
+_sampler = None
+
+def configure_logging(stream=sys.stderr):
+    # Eén JSON object per regel, los van de rest van de logging
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+def rss_mb():
+    # Huidige RSS van het proces (Linux), niet de hoogste ooit zoals
+    # ru_maxrss; None zonder /proc
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_MB
+    except (OSError, TypeError, ValueError):
+        return None
+
+def sample_rss():
+    # Eén thread per proces, die alleen bemonstert zolang er stages open zijn
+    while True:
+        _busy.wait()
+        time.sleep(RSS_SAMPLE_SECONDS)
+        rss = rss_mb()
+        with _open_lock:
+            for key, peak in _open_peaks.items():
+                _open_peaks[key] = max(peak, rss)
+
+def open_stage(key, rss):
+    global _sampler
+    with _open_lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=sample_rss, name="rss-sampler", daemon=True)
+            _sampler.start()
+        _open_peaks[key] = rss
+        _busy.set()
+
+def close_stage(key, rss):
+    with _open_lock:
+        peak = max(_open_peaks.pop(key), rss)
+        if not _open_peaks:
+            _busy.clear()
+    return peak
+
+def start_run():
+    _local.records = []
+    return _local.records
+
+def run_records():
+    return list(getattr(_local, "records", []))
+
+def recent_records(n=100):
+    # Nieuwste eerst, over alle sessies en threads, dus ook de warm-up
+    return list(RECENT)[::-1][:n]
+
+def mark_cache_miss():
+    # Wordt aangeroepen in de body van een gecachte functie, die draait
+    # alleen bij een miss
+    stack = getattr(_local, "stack", [])
+    if stack:
+        stack[-1]["cache"] = "miss"
+
+@contextmanager
+def stage(name, kind="pipeline", rows_in=None, cached=False):
+    record = {"stage": name, "kind": kind, "rows_in": rows_in, "rows_out": None}
+    if cached:
+        record["cache"] = "hit"
+
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(record)
+
+    # RSS van het hele proces tijdens deze stage: rss_mb aan het eind,
+    # rss_delta_mb van begin tot eind (negatief als er vrijkwam) en
+    # rss_peak_delta_mb van begin tot de hoogste meting ertussen. Andere
+    # sessies en de warm-up in hetzelfde proces tellen mee.
+    rss_before = rss_mb()
+    if rss_before is not None:
+        open_stage(id(record), rss_before)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        stack.pop()
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        if rss_before is not None:
+            rss_after = rss_mb()
+            peak = close_stage(id(record), rss_after)
+            record["rss_mb"] = round(rss_after, 1)
+            record["rss_delta_mb"] = round(rss_after - rss_before, 1)
+            record["rss_peak_delta_mb"] = round(peak - rss_before, 1)
+        record["timestamp"] = time.time()
+
+        RECENT.append(record)
+        if hasattr(_local, "records"):
+            _local.records.append(record)
+        logger.info(json.dumps(record, default=str))
@@ -0,0 +1,256 @@
+import json
+import os
+import re
+import shutil
+import unicodedata
+
+from aggregates import build_cube
+from diagnostics import stage
+from figures import (
+    METRIC_FIGURES,
+    figure_json,
+    flight_co2_figure,
+    metric_figure,
+    train_co2_figure,
+)
+from maps import base_map, route_geojson
+from pipeline import (
+    FLIGHTS_SOURCE,
+    ORIGIN,
+    build_route_tables,
+    dataset_version,
+    distance_view,
+    load_prepared,
+    origin_name,
+)
+from rail import origin_station, rail_routes, route_totals, score_segments, segment_table
+from ranking import rank
+from scenario import build_scenario, max_distance, scenario_at
+
+# -------------------------
+# Statische export
+# -------------------------
+# Alles wat voor elke bezoeker gelijk is wordt één keer berekend en als
+# bestanden weggeschreven. Een gewone webserver of CDN kan de bundel
+# serveren zonder Python per request:
+#
+#   <output>/manifest.json                 versie, luchthavens en bestanden
+#   <output>/index.html                    statische viewer (plotly.js)
+#   <output>/<ADEP>/map.html               folium kaart met alle routes
+#   <output>/<ADEP>/routes.geojson
+#   <output>/<ADEP>/routes/index.json      route -> bestand
+#   <output>/<ADEP>/routes/<slug>.json     routetabel per route
+#   <output>/<ADEP>/trains.json            treinsegmenten en totalen
+#   <output>/<ADEP>/scenario.json          what-if per SCENARIO_STEP_KM
+#   <output>/<ADEP>/rankings.json          top-k per dimensie
+#   <output>/<ADEP>/figures/<naam>.json    plotly spec per grafiek
+
+EXPORT_DIR = "export"
+MAX_DISTANCE_KM = 500
+SCENARIO_STEP_KM = 10
+RANKING_DIMENSIONS = ["Engine Model", "AC Operator", "Aircraft Variant"]
+RANKING_K = 3
+
+def slug(text):
+    # Düsseldorf -> dusseldorf, zodat bestandsnamen ASCII blijven
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "route"
+
+def write_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, allow_nan=False, default=str)
+
+def write_text(text, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def records(df):
+    # NaN wordt null, zodat de JSON ook in de browser geldig is
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+def export_routes(route_tables, path):
+    index = {}
+    for route, table in route_tables.items():
+        name = slug(route)
+        while f"{name}.json" in index.values():
+            name += "-"
+        index[route] = f"{name}.json"
+        write_json(records(table), os.path.join(path, index[route]))
+    write_json(index, os.path.join(path, "index.json"))
+    return len(index)
+
+def export_scenario(scenario, path):
+    steps = range(0, max_distance(scenario) + SCENARIO_STEP_KM, SCENARIO_STEP_KM)
+    write_json(
+        [dict(max_distance_km=km, **scenario_at(scenario, km)) for km in steps],
+        path,
+    )
+
+def export_rankings(cube, path):
+    rankings = {}
+    for dim in RANKING_DIMENSIONS:
+        ranking = rank(cube, dim, RANKING_K)
+        rankings[dim] = [
+            {"name": str(name), "score": float(score)}
+            for name, score in ranking.items()
+        ]
+    write_json(rankings, path)
+
+def export_origin(output, source=FLIGHTS_SOURCE, origin=ORIGIN):
+    # Zelfde bouwstenen als de gecachte loaders van het dashboard
+    path = os.path.join(output, origin)
+    dfmerge = load_prepared(source, origin)
+    if dfmerge.empty:
+        # Zoals de melding van het dashboard: alleen een lege entry, zodat
+        # de andere luchthavens gewoon geëxporteerd worden
+        return {"name": origin_name(origin), "rows": 0, "figures": []}
+    nearby = distance_view(dfmerge, MAX_DISTANCE_KM)
+
+    with stage(f"export:{origin}:map") as record:
+        geojson = route_geojson(nearby)
+        write_json(geojson, os.path.join(path, "routes.geojson"))
+        base_map(geojson).save(os.path.join(path, "map.html"))
+        record["rows_out"] = len(geojson["features"])
+
+    with stage(f"export:{origin}:routes") as record:
+        record["rows_out"] = export_routes(
+            build_route_tables(nearby), os.path.join(path, "routes")
+        )
+
+    with stage(f"export:{origin}:trains") as record:
+        station = origin_station(origin)
+        segments = score_segments(segment_table(
+            rail_routes(nearby["Bestemming"].dropna().unique(), origin=station)
+        ))
+        train_totals = route_totals(segments)
+        write_json(
+            {"segments": records(segments), "totals": records(train_totals)},
+            os.path.join(path, "trains.json"),
+        )
+        record["rows_out"] = len(segments)
+
+    with stage(f"export:{origin}:scenario"):
+        all_segments = score_segments(segment_table(
+            rail_routes(dfmerge["Bestemming"].dropna().unique(), origin=station)
+        ))
+        export_scenario(
+            build_scenario(dfmerge, route_totals(all_segments)),
+            os.path.join(path, "scenario.json"),
+        )
+
+    with stage(f"export:{origin}:figures") as record:
+        cube = build_cube(dfmerge)
+        figures = {
+            "train_co2": train_co2_figure(train_totals),
+            "flight_co2": flight_co2_figure(build_cube(nearby)),
+        }
+        figures.update({name: metric_figure(cube, name) for name in METRIC_FIGURES})
+        for name, fig in figures.items():
+            write_text(figure_json(fig), os.path.join(path, "figures", f"{name}.json"))
+        record["rows_out"] = len(figures)
+
+    export_rankings(cube, os.path.join(path, "rankings.json"))
+    return {"name": origin_name(origin), "rows": len(dfmerge), "figures": list(figures)}
+
+def export_bundle(output=EXPORT_DIR, source=FLIGHTS_SOURCE, origins=(ORIGIN,)):
+    # Eerst in een tijdelijke map, daarna in één keer omwisselen, zodat een
+    # webserver nooit een halve bundel serveert
+    tmp = output.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    manifest = {
+        "version": dataset_version(source),
+        "max_distance_km": MAX_DISTANCE_KM,
+        "origins": {origin: export_origin(tmp, source, origin) for origin in origins},
+    }
+    write_json(manifest, os.path.join(tmp, "manifest.json"))
+    write_text(INDEX_HTML, os.path.join(tmp, "index.html"))
+
+    old = output.rstrip("/\\") + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(output):
+        os.replace(output, old)
+    os.replace(tmp, output)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+# -------------------------
+# Statische viewer
+# -------------------------
+
+INDEX_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Aviation emissions</title>
+<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
+<style>
+  body { font-family: sans-serif; margin: 1.5rem; }
+  iframe { width: 100%; height: 480px; border: 0; }
+  table { border-collapse: collapse; font-size: 0.9rem; }
+  td, th { border: 1px solid #ddd; padding: 0.2rem 0.5rem; }
+</style>
+</head>
+<body>
+<h1>Sustainable flying</h1>
+<label>Departure airport <select id="origin"></select></label>
+<h2>Routes</h2>
+<iframe id="map"></iframe>
+<label>Route <select id="route"></select></label>
+<div id="table"></div>
+<h2>Charts</h2>
+<div id="figures"></div>
+<script>
+const get = (path) => fetch(path).then((r) => r.json());
+
+function table(rows) {
+  if (!rows.length) return "<p>No flights on this route.</p>";
+  const cols = Object.keys(rows[0]);
+  const head = cols.map((c) => `<th>${c}</th>`).join("");
+  const body = rows.map((r) => "<tr>" + cols.map((c) => `<td>${r[c] ?? ""}</td>`).join("") + "</tr>").join("");
+  return `<table><tr>${head}</tr>${body}</table>`;
+}
+
+async function showOrigin(origin, info, maxDistance) {
+  const select = document.getElementById("route");
+  const figures = document.getElementById("figures");
+  figures.innerHTML = "";
+  if (!info.rows) {
+    document.getElementById("map").src = "about:blank";
+    select.innerHTML = "";
+    document.getElementById("table").innerHTML = `<p>No flights departing from ${info.name} in this dataset.</p>`;
+    return;
+  }
+
+  document.getElementById("map").src = `${origin}/map.html`;
+  const routes = await get(`${origin}/routes/index.json`);
+  select.innerHTML = Object.keys(routes).map((r) => `<option>${r}</option>`).join("");
+  select.onchange = async () => {
+    document.getElementById("table").innerHTML = select.value
+      ? table(await get(`${origin}/routes/${routes[select.value]}`))
+      : `<p>No flights under ${maxDistance} km.</p>`;
+  };
+  select.onchange();
+
+  for (const name of info.figures) {
+    const div = document.createElement("div");
+    figures.appendChild(div);
+    const spec = await get(`${origin}/figures/${name}.json`);
+    Plotly.newPlot(div, spec.data, spec.layout);
+  }
+}
+
+get("manifest.json").then((manifest) => {
+  const select = document.getElementById("origin");
+  select.innerHTML = Object.entries(manifest.origins)
+    .map(([code, info]) => `<option value="${code}">${info.name}</option>`).join("");
+  select.onchange = () => showOrigin(select.value, manifest.origins[select.value], manifest.max_distance_km);
+  select.onchange();
+});
+</script>
+</body>
+</html>
+"""
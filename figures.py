@@ -0,0 +1,169 @@
+import plotly.express as px
+import plotly.io as pio
+
+from aggregates import cube_stat
+
+# -------------------------
+# Grafieken van de tabs
+# -------------------------
+# Elke grafiek is een naam met vaste dimensie, metric en sortering, zodat
+# hij per datasetversie één keer gebouwd en daarna hergebruikt kan worden.
+
+RATING = dict(ascending=False, color_continuous_scale="RdYlGn")
+EMISSION = dict(ascending=True, color_continuous_scale="RdYlGn_r")
+
+METRIC_FIGURES = {
+    # Engines
+    "engine_co2_rating": dict(
+        RATING, dim="Engine Model", metric="CO2 Rating Num",
+        labels={"Engine Model": "Engine Model", "CO2 Rating Num": "CO₂ Rating"},
+        layout=dict(
+            title="Average CO2 rating of each Engine model",
+            yaxis_title="CO2 Rating (higher = better)",
+            legend_title_text="CO2 Rating",
+        ),
+    ),
+    "engine_co2_passenger": dict(
+        EMISSION, dim="Engine Model", metric="CO2 per passenger",
+        labels={"Engine Model": "Engine Model", "CO2 per passenger": "CO2 emission"},
+        layout=dict(
+            title="Average CO2 emission per passenger in take off of each engine model",
+        ),
+    ),
+    "engine_sustainability": dict(
+        RATING, dim="Engine Model", metric="Sustainability rating num",
+        labels={
+            "Engine Model": "Engine Model",
+            "Sustainability rating num": "Sustainability rating",
+        },
+        layout=dict(
+            title="Average sustainability rating of each engine model",
+            yaxis_title="Sustainability rating (higher = better)",
+        ),
+    ),
+    # Airlines
+    "operator_co2_rating": dict(
+        RATING, dim="AC Operator", metric="CO2 Rating Num",
+        labels={"AC Operator": "Aircraft operator", "CO2 Rating Num": "CO₂ Rating"},
+        layout=dict(
+            title="Average CO2 rating of each aircraft operator",
+            yaxis_title="CO2 Rating (hoger = beter)",
+            legend_title_text="CO2 Rating",
+        ),
+    ),
+    "operator_co2_passenger": dict(
+        EMISSION, dim="AC Operator", metric="CO2 per passenger",
+        labels={
+            "AC Operator": "Aircraft operator",
+            "CO2 per passenger": "CO₂ emission (kg/pass)",
+        },
+        layout=dict(
+            title="Average CO2 emission per passenger of each aircraft operator",
+            yaxis_title="CO2 emission (kg/pass)",
+        ),
+    ),
+    "operator_sustainability": dict(
+        RATING, dim="AC Operator", metric="Sustainability rating num",
+        labels={
+            "AC Operator": "Aircraft operator",
+            "Sustainability rating num": "Sustainability rating",
+        },
+        layout=dict(
+            title="Average sustainability rating of each aircraft operator",
+            yaxis_title="Sustainability rating (higher = better)",
+        ),
+    ),
+    # Aircrafts
+    "variant_co2_rating": dict(
+        RATING, dim="Aircraft Variant", metric="CO2 Rating Num",
+        labels={"Aircraft Variant": "Aircraft Variant", "CO2 Rating Num": "CO₂ Rating"},
+        layout=dict(
+            title=" Average CO2 rating of each aircraft variant",
+            yaxis_title="CO2 rating (hoger is beter)",
+            legend_title_text="CO2 Rating",
+        ),
+    ),
+    "variant_co2_passenger": dict(
+        EMISSION, dim="Aircraft Variant", metric="CO2 per passenger",
+        labels={"Aircraft Variant": "Aircraft Variant", "CO2 per passenger": "CO₂ Emission"},
+        layout=dict(
+            title="Average CO₂ per passenger of each Aircraft vairant",
+            yaxis_title="CO2 Emission per passenger (kg/pass)",
+        ),
+    ),
+    "variant_sustainability": dict(
+        RATING, dim="Aircraft Variant", metric="Sustainability rating num",
+        labels={
+            "Aircraft Variant": "Aircraft Variant",
+            "Sustainability rating num": "Sustainability rating",
+        },
+        layout=dict(
+            title="Average sustainability rating of each Aircraft variant",
+            yaxis_title="Sustainability rating (higher = better)",
+        ),
+    ),
+}
+
+# Labels zonder echte waarde horen niet in de ranglijsten
+HIDDEN = {"Engine Model": ["Unknown"], "Aircraft Variant": ["Unknown"]}
+
+TAB_FIGURES = {
+    "engines": ["engine_co2_rating", "engine_co2_passenger", "engine_sustainability"],
+    "airlines": ["operator_co2_rating", "operator_co2_passenger", "operator_sustainability"],
+    "aircrafts": ["variant_co2_rating", "variant_co2_passenger", "variant_sustainability"],
+}
+
+def metric_figure(cube, name):
+    spec = METRIC_FIGURES[name]
+    dim, metric = spec["dim"], spec["metric"]
+
+    df = cube_stat(cube, dim)
+    df = df[~df[dim].isin(HIDDEN.get(dim, []))]
+    df = df.sort_values(metric, ascending=spec["ascending"], kind="stable")
+
+    fig = px.bar(
+        df,
+        x=dim,
+        y=metric,
+        color=metric,
+        color_continuous_scale=spec["color_continuous_scale"],
+        labels=spec["labels"],
+    )
+    fig.update_layout(xaxis_tickangle=-45, template="plotly_white", **spec["layout"])
+    return fig
+
+def train_co2_figure(train_totals):
+    fig = px.bar(
+        train_totals,
+        x="Totale_CO2_kg",
+        y="Bestemming",
+        title="Train CO₂ emissions per passenger of each destination",
+        labels={
+            "Bestemming": "Destination",
+            "Totale_CO2_kg": "CO₂ emissions per passenger (kg/pass)"
+        },
+        color_discrete_sequence=["green"],
+    )
+    fig.update_layout(template="plotly_white", xaxis_tickangle=-45)
+    return fig
+
+def flight_co2_figure(cube):
+    flightco2 = cube_stat(cube, "Bestemming")[["Bestemming", "CO2 per passenger"]]
+    fig = px.bar(
+        flightco2,
+        x="CO2 per passenger",
+        y="Bestemming",
+        title="Flight CO₂ emissions per passenger of each destination",
+        labels={"Bestemming": "Destination"},
+        color_discrete_sequence=["red"]
+    )
+    fig.update_layout(
+        xaxis_title="CO₂ emissions per passenger (kg/pass)",
+        template="plotly_white",
+        xaxis_tickangle=-45
+    )
+    return fig
+
+def figure_json(fig):
+    # Geserialiseerde spec, zoals plotly.js hem inleest
+    return pio.to_json(fig, validate=False)
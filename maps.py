@@ -0,0 +1,72 @@
+import folium
+
+MAP_COLUMNS = [
+    "Vertrek", "Bestemming",
+    "ADEP Latitude", "ADEP Longitude",
+    "ADES Latitude", "ADES Longitude",
+    "Route",
+]
+
+ROUTE_STYLE = {"color": "gray", "weight": 2, "opacity": 0.4}
+HIGHLIGHT_STYLE = {"color": "lime", "weight": 3, "opacity": 0.9}
+
+def route_geojson(df):
+    # Eén FeatureCollection met een LineString per route (GeoJSON is lon/lat)
+    # Rijen zonder bestemming of coördinaten hebben geen lijn op de kaart
+    dfmap = (
+        df.drop_duplicates(subset=["Vertrek", "Bestemming"])[MAP_COLUMNS]
+        .dropna(subset=["Bestemming", "ADES Latitude", "ADES Longitude"])
+    )
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "LineString",
+                "coordinates": [[adep_lon, adep_lat], [ades_lon, ades_lat]],
+            },
+            "properties": {"Route": route},
+        }
+        for adep_lat, adep_lon, ades_lat, ades_lon, route in zip(
+            *(
+                dfmap[col].to_numpy(dtype=float).tolist()
+                for col in ["ADEP Latitude", "ADEP Longitude",
+                            "ADES Latitude", "ADES Longitude"]
+            ),
+            dfmap["Route"].astype(str),
+        )
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+def base_map(geojson):
+    m = folium.Map(
+        location=[52.3676, 5.2],  # Amsterdam
+        zoom_start=5,
+        tiles="cartodbdark_matter"
+    )
+
+    # Alle routes als één laag, de stijl hangt niet af van de selectie.
+    # Zonder routes geen laag: de tooltip eist dat het veld Route bestaat.
+    if not geojson["features"]:
+        return m
+    folium.GeoJson(
+        geojson,
+        name="Routes",
+        style_function=lambda feature: ROUTE_STYLE,
+        tooltip=folium.GeoJsonTooltip(fields=["Route"], labels=False),
+    ).add_to(m)
+    return m
+
+def highlight_layer(geojson, route):
+    # Alleen de gekozen route, bovenop de basiskaart getekend
+    layer = folium.FeatureGroup(name="Selected route")
+    features = [
+        feature for feature in geojson["features"]
+        if feature["properties"]["Route"] == route
+    ]
+    if features:
+        folium.GeoJson(
+            {"type": "FeatureCollection", "features": features},
+            style_function=lambda feature: HIGHLIGHT_STYLE,
+            tooltip=folium.GeoJsonTooltip(fields=["Route"], labels=False),
+        ).add_to(layer)
+    return layer
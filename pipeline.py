@@ -0,0 +1,682 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from diagnostics import stage
+
+logger = logging.getLogger(__name__)
+
+FLIGHTS_SOURCE = "."
+FLIGHTS_PATTERN = "flights_hackaton_*.parquet"
+FLIGHT_COLUMNS = ["ADES", "NAME_ADES"]
+SUSTAINABILITY_CSV = "LCC&FCC_Flights_Final_Sustainability_Score_and_Rating.csv"
+
+# Ophogen bij elke wijziging in de pipeline, zodat oude caches vervallen
+PIPELINE_VERSION = 6
+CACHE_DIR = ".cache"
+STORE_DIR = "store"
+
+# Vertrekluchthavens (ADEP) en hun naam in de kolom Vertrek
+ORIGIN = "EHAM"
+ORIGINS = {
+    "EHAM": "Schiphol",
+    "EHEH": "Eindhoven",
+    "EHRD": "Rotterdam",
+    "EBBR": "Brussels",
+}
+# Rijen per CSV blok, zodat andere luchthavens nooit tegelijk in het
+# geheugen staan
+CSV_CHUNK_ROWS = 500_000
+
+def origin_name(origin=ORIGIN):
+    return ORIGINS.get(origin, origin)
+
+def discover_flight_files(source=FLIGHTS_SOURCE):
+    # Een lijst wordt direct gebruikt, een map levert alle maandbestanden
+    # op, anders is source een glob
+    if isinstance(source, (list, tuple)):
+        return sorted(source)
+    if os.path.isdir(source):
+        source = os.path.join(source, FLIGHTS_PATTERN)
+    files = sorted(glob.glob(source))
+    if not files:
+        raise FileNotFoundError(f"No flight files found for {source!r}")
+    return files
+
+def read_flights(path, origin=ORIGIN, columns=FLIGHT_COLUMNS):
+    # Filter en kolommen gaan direct naar de parquet reader, zodat
+    # row groups van andere luchthavens niet gedecodeerd worden
+    return pq.read_table(
+        path,
+        columns=columns,
+        filters=[("ADEP", "==", origin)]
+    )
+
+def load_flights(source=FLIGHTS_SOURCE, origin=ORIGIN, columns=FLIGHT_COLUMNS):
+    files = discover_flight_files(source)
+
+    # Arrow decodeert zonder de GIL, dus threads schalen met het aantal cores
+    with ThreadPoolExecutor() as pool:
+        tables = list(pool.map(
+            lambda path: read_flights(path, origin, columns), files
+        ))
+
+    # Eén keer samenvoegen en pas daarna naar pandas. Maanden die door
+    # een andere writer geschreven zijn kunnen bv. large_string hebben,
+    # die worden naar een gemeenschappelijk type gebracht.
+    return pa.concat_tables(tables, promote_options="permissive").to_pandas()
+
+def sustainability_batches(origin=ORIGIN, batch_rows=CSV_CHUNK_ROWS, usecols=None):
+    for chunk in pd.read_csv(SUSTAINABILITY_CSV, chunksize=batch_rows, usecols=usecols):
+        yield chunk[chunk["ADEP"] == origin]
+
+def read_sustainability(origin=ORIGIN):
+    # Per blok filteren: het geheugen groeit met de rijen van deze
+    # luchthaven, niet met die van alle luchthavens samen
+    return pd.concat(sustainability_batches(origin), ignore_index=True)
+
+def build_destination_dim(df_fl, dftest=None):
+    # Eén rij per ADES, zodat joins schalen met het aantal luchthavens
+    # in plaats van met het aantal vluchten
+    dim = df_fl.drop_duplicates(subset="ADES").reset_index(drop=True)
+
+    if dftest is not None:
+        coords = (
+            dftest
+            .groupby("ADES")[["ADES Latitude", "ADES Longitude"]]
+            .first()
+            .reset_index()
+        )
+        dim = dim.merge(coords, on="ADES", how="left", validate="one_to_one")
+
+    return dim
+
+IMPUTE_STRATEGIES = ("median", "mean", "mode")
+
+def default_impute_strategies(df, by):
+    # Numeriek → mediaan, de rest → meest voorkomende waarde
+    num_cols = df.select_dtypes(include="number").columns
+    return {
+        col: "median" if col in num_cols else "mode"
+        for col in df.columns
+        if col != by
+    }
+
+def modes_from_counts(counts, by, col):
+    # Bij gelijke aantallen wint de kleinste waarde, net als Series.mode()
+    counts = counts.sort_values([by, "n", col], ascending=[True, False, True])
+    return counts.drop_duplicates(subset=by).set_index(by)[col]
+
+def group_modes(df, by, col):
+    counts = df.groupby([by, col]).size().reset_index(name="n")
+    return modes_from_counts(counts, by, col)
+
+def group_fill_values(df, by, strategies=None):
+    if strategies is None:
+        strategies = default_impute_strategies(df, by)
+
+    unknown = set(strategies.values()) - set(IMPUTE_STRATEGIES)
+    if unknown:
+        raise ValueError(f"Unknown impute strategy: {sorted(unknown)}")
+
+    # Eén gevectoriseerde aggregatie per strategie over alle kolommen
+    fills = {}
+    for strategy in ("median", "mean"):
+        cols = [col for col, s in strategies.items() if s == strategy]
+        if cols:
+            stats = df.groupby(by)[cols].agg(strategy)
+            fills.update({col: stats[col] for col in cols})
+
+    for col, strategy in strategies.items():
+        if strategy == "mode":
+            fills[col] = group_modes(df, by, col)
+
+    return pd.DataFrame(fills)
+
+def apply_group_fills(df, by, fills):
+    if fills.empty:
+        return df
+
+    # Groepswaarden terugzetten op elke rij zonder Python callbacks
+    fill_values = fills.reindex(df[by].to_numpy()).set_axis(df.index)
+    cols = list(fills.columns)
+    df = df.copy()
+    df[cols] = df[cols].fillna(fill_values)
+    return df
+
+def impute_by_group(df, by, strategies=None):
+    return apply_group_fills(df, by, group_fill_values(df, by, strategies))
+
+def input_fingerprint(paths, **params):
+    # Grootte en mtime van elk invoerbestand, de pipelineversie en de
+    # parameters bepalen samen de cache key
+    h = hashlib.sha256(f"v{PIPELINE_VERSION}".encode())
+    for path in sorted(paths):
+        stat = os.stat(path)
+        h.update(
+            f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+        )
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+def dataset_version(source=FLIGHTS_SOURCE):
+    # Verandert zodra een invoerbestand of de pipeline verandert
+    paths = discover_flight_files(source) + [SUSTAINABILITY_CSV]
+    return input_fingerprint(paths, source=source)
+
+def write_arrow(df, path):
+    # Eerst naar een tijdelijk bestand, zodat andere replicas nooit een
+    # half geschreven cache lezen
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def read_arrow(path):
+    # Memory mapped en per kolom een eigen block: numerieke kolommen zonder
+    # nulls blijven views op de gemapte pagina's, die replicas via de page
+    # cache delen. Alleen categorie codes en Int8 kolommen worden gekopieerd.
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+
+def disk_cached(name, build, paths, **params):
+    key = input_fingerprint(paths, **params)
+    path = os.path.join(CACHE_DIR, f"{name}_{key}.arrow")
+    if os.path.exists(path):
+        with stage(f"disk_cache:{name}", kind="cache", cached=True) as record:
+            df = read_arrow(path)
+            record["rows_out"] = len(df)
+        return df
+
+    with stage(f"disk_cache:{name}", kind="cache") as record:
+        record["cache"] = "miss"
+        df = build(**params)
+        write_arrow(df, path)
+        record["rows_out"] = len(df)
+
+    # Verouderde versies van dezelfde tabel opruimen
+    for old_path in glob.glob(os.path.join(CACHE_DIR, f"{name}_*.arrow")):
+        if old_path != path:
+            os.remove(old_path)
+    return df
+
+def load_prepared(source=FLIGHTS_SOURCE, origin=ORIGIN, store=STORE_DIR):
+    # Een actuele store van ingest is al voorbereid, dan kost een nieuwe
+    # maand alleen een ingest in plaats van alles opnieuw. Een store van
+    # stream_prepare is een benadering en wordt hier niet gebruikt.
+    if store_is_current(source, store, origin):
+        with stage("read_store") as record:
+            dfmerge = read_store(store, origin)
+            record["rows_out"] = len(dfmerge)
+        return dfmerge
+
+    # Anders één cachebestand per luchthaven, zodat alleen die van origin
+    # gelezen wordt
+    paths = discover_flight_files(source) + [SUSTAINABILITY_CSV]
+    return disk_cached(
+        f"flights_{origin}", prepare_flights, paths, source=source, origin=origin
+    )
+
+def merge_destinations(dftest, dim, origin=ORIGIN):
+    # -------------------------
+    # Merge
+    # -------------------------
+    dfmerge = dftest.merge(
+        dim[["ADES", "NAME_ADES"]],
+        on="ADES",
+        how="left",
+        validate="many_to_one"
+    )
+
+    # -------------------------
+    # Kolommen herschikken
+    # -------------------------
+    dfmerge.insert(0, "Vertrek", origin_name(origin))
+    dfmerge.insert(1, "Bestemming", dfmerge.pop("NAME_ADES"))
+
+    # -------------------------
+    # Opschonen
+    # -------------------------
+    dfmerge = dfmerge.drop_duplicates()
+
+    return dfmerge.drop(
+        [
+            "CO2 per FC seat (kg/km/seat)",
+            "CO2 per PEC seat (kg/km/seat)",
+            "Jet Engine type",
+        ],
+        axis=1,
+        errors="ignore"
+    )
+
+RATINGS = ["A", "B", "C", "D", "E", "F", "G"]
+
+# Herhaalde strings worden categorieën, die slaan elke waarde maar één keer op
+CATEGORY_COLUMNS = [
+    "Vertrek", "Bestemming", "Route", "ADEP", "ADES",
+    "AC Operator", "AC Type", "Aircraft Variant", "Engine Model",
+]
+
+# Getoonde metrics blijven float64: een afgeronde float32 is geen waarde
+# met twee decimalen (492.37 wordt 492.369995)
+FLOAT64_COLUMNS = ["Actual Distance Flown (km)", "CO2 per passenger"]
+
+def rating_number(ratings):
+    # A → 7 ... G → 1 als int8, onbekende labels worden <NA>
+    codes = ratings.cat.codes.to_numpy()
+    return pd.Series(
+        len(RATINGS) - codes, index=ratings.index, dtype="Int8"
+    ).mask(codes < 0)
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+def compact_schema(df):
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS and df[col].dtype != "category":
+            df[col] = df[col].astype("category")
+        elif col in FLOAT64_COLUMNS:
+            df[col] = df[col].astype("float64")
+        elif pd.api.types.is_float_dtype(df[col]) and df[col].dtype != "float32":
+            df[col] = pd.to_numeric(df[col], downcast="float")
+        elif pd.api.types.is_integer_dtype(df[col]) and not isinstance(
+            df[col].dtype, pd.api.extensions.ExtensionDtype
+        ):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+def add_rating_numbers(dfmerge):
+    for col in ["CO2 Rating", "Sustainability Rating"]:
+        dfmerge[col] = pd.Categorical(dfmerge[col], categories=RATINGS, ordered=True)
+
+    dfmerge['CO2 Rating Num'] = rating_number(dfmerge["CO2 Rating"])
+    dfmerge['Sustainability rating num'] = rating_number(dfmerge['Sustainability Rating'])
+    return dfmerge
+
+def finish_prepared(dfmerge):
+    dfmerge = add_rating_numbers(dfmerge)
+    airline_map = {
+    "KLM": "KLM Royal Dutch Airlines",
+    "TRA": "Transavia",
+    "SXS": "SunExpress",
+    "AEE": "Aegean Airlines",
+    "VLG": "Vueling Airlines",
+    "EZS": "easyJet Switzerland",
+    "ASL": "ASL Airlines",
+    "AMC": "Air Malta Charter",
+    "ROT": "TAROM",
+    "RYR": "Ryanair",
+    "EIN": "Aer Lingus",
+    "DLH": "Lufthansa",
+    "CPA": "Cathay Pacific",
+    "FIN": "Finnair",
+    "THY": "Turkish Airlines",
+    "PGT": "Pegasus Airlines",
+    "ICE": "Icelandair",
+    "TAP": "TAP Air Portugal",
+    "BAW": "British Airways",
+    "AEA": "Air Europa",
+    "IBE": "Iberia",
+    "AFR": "Air France",
+    "UAE": "Emirates",
+    "BTI": "airBaltic",
+    "AUA": "Austrian Airlines",
+    "LOT": "LOT Polish Airlines",
+    "CTN": "Croatia Airlines",
+    "SWR": "SWISS International Air Lines"
+    }
+    dfmerge["AC Operator"] = dfmerge["AC Operator"].map(airline_map)
+    dfmerge["Route"] = dfmerge["Vertrek"] + " → " + dfmerge["Bestemming"]
+    dfmerge['CO2 per passenger'] = dfmerge['CO2 per Passenger (kg/km/passenger)'] * dfmerge['Actual Distance Flown (km)']
+    dfmerge = dfmerge.sort_values("Bestemming").reset_index(drop=True)
+
+    # -------------------------
+    # Compact geheugengebruik
+    # -------------------------
+    before = memory_mb(dfmerge)
+    dfmerge = compact_schema(dfmerge)
+    logger.info(
+        "Prepared flights: %d rows, %.1f MB → %.1f MB",
+        len(dfmerge), before, memory_mb(dfmerge)
+    )
+    return dfmerge
+
+def prepare_flights(source=FLIGHTS_SOURCE, origin=ORIGIN):
+    # -------------------------
+    # Flights data (parquet)
+    # -------------------------
+    with stage("load_flights") as record:
+        df_fl = load_flights(source, origin)
+        record["rows_out"] = len(df_fl)
+
+    # -------------------------
+    # Sustainability data
+    # -------------------------
+    with stage("read_sustainability") as record:
+        dftest = read_sustainability(origin)
+        record["rows_out"] = len(dftest)
+
+    with stage("merge_destinations", rows_in=len(dftest)) as record:
+        dim = build_destination_dim(df_fl, dftest)
+        dfmerge = merge_destinations(dftest, dim, origin)
+        record["rows_out"] = len(dfmerge)
+
+    # -------------------------
+    # Missing values invullen
+    # -------------------------
+    with stage("impute_by_group", rows_in=len(dfmerge)) as record:
+        dfmerge = impute_by_group(dfmerge, "Bestemming")
+        record["rows_out"] = len(dfmerge)
+
+    with stage("finish_prepared", rows_in=len(dfmerge)) as record:
+        dfmerge = finish_prepared(dfmerge)
+        record["rows_out"] = len(dfmerge)
+    return dfmerge
+
+def distance_view(dfmerge, max_distance_km=None):
+    # Afgeleide selectie op de basisdataset, de pipeline draait maar één keer
+    if max_distance_km is None:
+        return dfmerge
+    return dfmerge[dfmerge["Actual Distance Flown (km)"] <= max_distance_km]
+
+ROUTE_COLUMNS = [
+    "AC Operator", "AC Type", "Aircraft Variant", "Engine Model",
+    "Actual Distance Flown (km)", "CO2 Rating", "CO2 per passenger",
+    "Sustainability Rating",
+]
+
+def build_route_tables(dfmerge):
+    # Eén keer sorteren en ontdubbelen, daarna per route een kant-en-klare
+    # tabel zodat een selectie een dictionary lookup is
+    df_route = dfmerge.sort_values(
+        by=["CO2 Rating Num", "CO2 per passenger", "Sustainability rating num"],
+        ascending=[False, True, True],
+        kind="stable"
+    )
+    df_route = df_route.drop_duplicates(
+        subset=["Route", "CO2 Rating Num", "CO2 per passenger",
+                "AC Operator", "Aircraft Variant", "Engine Model"]
+    )
+    df_route = df_route.assign(
+        **{
+            "Actual Distance Flown (km)": df_route["Actual Distance Flown (km)"].round(2),
+            "CO2 per passenger": df_route["CO2 per passenger"].round(2),
+        }
+    )
+    return {
+        route: group[ROUTE_COLUMNS].reset_index(drop=True)
+        for route, group in df_route.groupby("Route", sort=False, observed=True)
+    }
+
+# -------------------------
+# Incrementele ingestie
+# -------------------------
+# De store is gepartitioneerd per vertrekluchthaven (ADEP=<code>). Elke
+# partitie bevat de voorbereide rijen gepartitioneerd per bestemming, de
+# destination dimension en de imputatiewaarden per bestemming. Omdat de
+# imputatie per bestemming groepeert, hoeven bij een nieuwe maand alleen
+# de bestemmingen die erbij komen opnieuw berekend te worden.
+
+def origin_store(store=STORE_DIR, origin=ORIGIN):
+    return os.path.join(store, f"ADEP={origin}")
+
+def read_manifest(store=STORE_DIR):
+    path = os.path.join(store, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_manifest(manifest, store=STORE_DIR):
+    path = os.path.join(store, "manifest.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def flight_file_keys(source=FLIGHTS_SOURCE):
+    return {
+        os.path.abspath(path): input_fingerprint([path])
+        for path in discover_flight_files(source)
+    }
+
+def store_is_current(source=FLIGHTS_SOURCE, store=STORE_DIR, origin=ORIGIN):
+    # Zelfde pipelineversie, sustainability data en precies dezelfde
+    # maandbestanden als de invoer, gebouwd door ingest en dus gelijk aan
+    # prepare_flights. stream_prepare neemt de medianen uit een steekproef
+    # en ontdubbelt per batch.
+    manifest = read_manifest(origin_store(store, origin))
+    return (
+        "columns" in manifest
+        and manifest.get("builder") == "ingest"
+        and manifest.get("pipeline_version") == PIPELINE_VERSION
+        and manifest.get("sustainability") == input_fingerprint([SUSTAINABILITY_CSV])
+        and manifest.get("files") == flight_file_keys(source)
+    )
+
+def read_store_table(store, name):
+    path = os.path.join(store, f"{name}.parquet")
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+def store_table(dfmerge):
+    # Vast schema in de store: strings in plaats van dictionaries en float64,
+    # zodat partities uit verschillende runs samen gelezen kunnen worden.
+    # read_store maakt het weer compact.
+    table = pa.Table.from_pandas(dfmerge, preserve_index=False)
+    fields = []
+    for field in table.schema:
+        field_type = field.type
+        if pa.types.is_dictionary(field_type):
+            field_type = field_type.value_type
+        if pa.types.is_floating(field_type):
+            field_type = pa.float64()
+        if pa.types.is_large_string(field_type):
+            field_type = pa.string()
+        fields.append(pa.field(field.name, field_type))
+    return table.cast(pa.schema(fields))
+
+# Map waarin pyarrow de rijen zonder bestemming schrijft
+NULL_PARTITION = "Bestemming=__HIVE_DEFAULT_PARTITION__"
+
+def write_prepared_partitions(
+    dfmerge, store, existing_data_behavior, basename_template="part-{i}.parquet"
+):
+    ds.write_dataset(
+        store_table(dfmerge),
+        os.path.join(store, "prepared"),
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("Bestemming", pa.string())]), flavor="hive"
+        ),
+        existing_data_behavior=existing_data_behavior,
+        basename_template=basename_template
+    )
+
+def ingest(source=FLIGHTS_SOURCE, store=STORE_DIR, origin=ORIGIN):
+    store = origin_store(store, origin)
+    manifest = read_manifest(store)
+    sustainability_key = input_fingerprint([SUSTAINABILITY_CSV])
+
+    # Andere pipelineversie of nieuwe sustainability data: alles opnieuw
+    if (
+        manifest.get("pipeline_version") != PIPELINE_VERSION
+        or manifest.get("sustainability") != sustainability_key
+    ):
+        shutil.rmtree(store, ignore_errors=True)
+        manifest = {
+            "pipeline_version": PIPELINE_VERSION,
+            "sustainability": sustainability_key,
+            "files": {},
+            # Ingest op een store van stream_prepare houdt "stream": de
+            # oude partities blijven een benadering
+            "builder": "ingest",
+        }
+    os.makedirs(store, exist_ok=True)
+
+    file_keys = flight_file_keys(source)
+    new_files = [
+        path for path, key in file_keys.items()
+        if manifest["files"].get(path) != key
+    ]
+    if not new_files:
+        return []
+
+    # -------------------------
+    # Nieuwe bestemmingen bepalen
+    # -------------------------
+    dftest = read_sustainability(origin)
+    dim_old = read_store_table(store, "destinations")
+    dim_new = build_destination_dim(load_flights(new_files, origin), dftest)
+    if dim_old is not None:
+        dim_new = dim_new[~dim_new["ADES"].isin(dim_old["ADES"])]
+        dim = pd.concat([dim_old, dim_new], ignore_index=True)
+    else:
+        dim = dim_new
+
+    if not dim_new.empty:
+        # Een nieuwe ADES kan bij een bestaande bestemming horen, dan
+        # wordt die hele groep opnieuw berekend
+        affected = dim_new["NAME_ADES"].dropna().unique()
+        ades = dim.loc[dim["NAME_ADES"].isin(affected), "ADES"]
+
+        # Rijen met een ADES zonder vluchten houden, zoals de left join in
+        # merge_destinations. Ze staan zonder bestemming in de null partitie,
+        # die elke keer opnieuw geschreven wordt omdat een nieuwe maand ze
+        # een bestemming kan geven.
+        unmatched = ~dftest["ADES"].isin(dim["ADES"])
+        dfmerge = merge_destinations(dftest[dftest["ADES"].isin(ades) | unmatched], dim, origin)
+        fills = group_fill_values(dfmerge, "Bestemming")
+        dfmerge = finish_prepared(apply_group_fills(dfmerge, "Bestemming", fills))
+
+        shutil.rmtree(os.path.join(store, "prepared", NULL_PARTITION), ignore_errors=True)
+        write_prepared_partitions(dfmerge, store, existing_data_behavior="delete_matching")
+
+        # Vooraf berekende aggregaten kloppen niet meer voor deze groepen
+        shutil.rmtree(os.path.join(store, "aggregates"), ignore_errors=True)
+        manifest.pop("aggregates", None)
+
+        # Imputatiewaarden per bestemming bijwerken
+        fills = fills.rename_axis("Bestemming").reset_index()
+        stats_old = read_store_table(store, "group_stats")
+        if stats_old is not None:
+            stats_old = stats_old[~stats_old["Bestemming"].isin(affected)]
+            fills = pd.concat([stats_old, fills], ignore_index=True)
+        fills.to_parquet(os.path.join(store, "group_stats.parquet"), index=False)
+
+        dim.to_parquet(os.path.join(store, "destinations.parquet"), index=False)
+        manifest["columns"] = list(dfmerge.columns)
+
+    manifest["files"].update({path: file_keys[path] for path in new_files})
+    write_manifest(manifest, store)
+    return new_files
+
+def read_store(store=STORE_DIR, origin=ORIGIN):
+    # Alleen de partitie van deze luchthaven wordt gelezen
+    store = origin_store(store, origin)
+    manifest = read_manifest(store)
+    if "columns" not in manifest:
+        raise FileNotFoundError(f"No prepared data in {store!r}, run ingest first")
+
+    dfmerge = ds.dataset(
+        os.path.join(store, "prepared"),
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("Bestemming", pa.string())]), flavor="hive"
+        )
+    ).to_table().to_pandas()
+
+    # Ratings en hun int8 codes komen als gewone kolommen uit parquet
+    dfmerge = add_rating_numbers(dfmerge[manifest["columns"]])
+    return compact_schema(
+        dfmerge
+        .sort_values("Bestemming")
+        .reset_index(drop=True)
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aviation emission data pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_cmd = commands.add_parser(
+        "ingest", help="Prepare only flight files that are not in the store yet"
+    )
+    ingest_cmd.add_argument("--source", default=FLIGHTS_SOURCE)
+    ingest_cmd.add_argument("--store", default=STORE_DIR)
+
+    prepare_cmd = commands.add_parser(
+        "prepare", help="Build the prepared flights table into the disk cache"
+    )
+    prepare_cmd.add_argument("--source", default=FLIGHTS_SOURCE)
+
+    stream_cmd = commands.add_parser(
+        "stream", help="Rebuild the store in record batches, for data larger than RAM"
+    )
+    stream_cmd.add_argument("--source", default=FLIGHTS_SOURCE)
+    stream_cmd.add_argument("--store", default=STORE_DIR)
+    stream_cmd.add_argument("--batch-rows", type=int, default=500_000)
+
+    export_cmd = commands.add_parser(
+        "export", help="Write the dashboard as a static bundle for a plain web server"
+    )
+    export_cmd.add_argument("--source", default=FLIGHTS_SOURCE)
+    export_cmd.add_argument("--output", default="export")
+
+    serve_cmd = commands.add_parser(
+        "serve", help="Serve a read-only JSON API over the prepared flights"
+    )
+    serve_cmd.add_argument("--source", default=FLIGHTS_SOURCE)
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+
+    for cmd in (ingest_cmd, prepare_cmd, stream_cmd, export_cmd, serve_cmd):
+        cmd.add_argument(
+            "--origin", nargs="+", default=[ORIGIN],
+            help="Departure airports (ADEP codes), one partition each"
+        )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "export":
+        # Lazy, de export heeft plotly en folium nodig
+        from export import export_bundle
+        manifest = export_bundle(args.output, args.source, args.origin)
+        print(f"Exported {len(manifest['origins'])} airport(s) into {args.output}")
+        return
+    if args.command == "serve":
+        # Lazy, net als export; --origin wordt vooraf geladen
+        from api import serve
+        serve(args.host, args.port, args.source, args.origin)
+        return
+    for origin in args.origin:
+        if args.command == "prepare":
+            dfmerge = load_prepared(args.source, origin)
+            print(f"Prepared {len(dfmerge)} rows for {origin} ({memory_mb(dfmerge):.1f} MB)")
+        elif args.command == "ingest":
+            new_files = ingest(args.source, args.store, origin)
+            print(f"Ingested {len(new_files)} new file(s) for {origin} into {args.store}")
+            for path in new_files:
+                print(f"  {path}")
+        elif args.command == "stream":
+            # Lazy, streaming importeert zelf uit deze module
+            from streaming import stream_prepare
+            rows = stream_prepare(args.source, args.store, origin, args.batch_rows)
+            print(f"Streamed {rows} rows for {origin} into {args.store}")
+
+if __name__ == "__main__":
+    main()
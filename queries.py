@@ -0,0 +1,177 @@
+import os
+
+try:
+    import duckdb
+except ImportError:  # optionele backend
+    duckdb = None
+
+import pandas as pd
+
+from aggregates import CUBE_DIMENSIONS, METRICS, QUANTILES
+from diagnostics import stage
+from maps import MAP_COLUMNS
+from pipeline import (
+    ORIGIN,
+    ROUTE_COLUMNS,
+    STORE_DIR,
+    input_fingerprint,
+    origin_store,
+    read_manifest,
+)
+
+# -------------------------
+# SQL backend
+# -------------------------
+# DuckDB leest de parquet bestanden zelf, met filter- en kolompushdown en
+# over alle cores. Alleen het resultaat van een query komt in pandas, niet
+# de hele store.
+
+SCENARIO_COLUMNS = [
+    "Bestemming", "Actual Distance Flown (km)",
+    "Total CO2 Emissions (kg)", "CO2 per passenger",
+]
+
+def available():
+    return duckdb is not None
+
+def connect(threads=None):
+    if duckdb is None:
+        raise ImportError("The query backend needs duckdb: pip install duckdb")
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    return con
+
+def ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def has_store(store=STORE_DIR, origin=ORIGIN):
+    return "columns" in read_manifest(origin_store(store, origin))
+
+def store_version(store=STORE_DIR, origin=ORIGIN):
+    # Verandert bij elke ingest of stream van deze luchthaven
+    path = os.path.join(origin_store(store, origin), "manifest.json")
+    if not os.path.exists(path):
+        return None
+    return input_fingerprint([path])
+
+def prepared_source(store=STORE_DIR, origin=ORIGIN):
+    path = os.path.join(origin_store(store, origin), "prepared", "*", "*.parquet")
+    return (
+        f"read_parquet({literal(path)}, hive_partitioning = true, "
+        "hive_types = {'Bestemming': VARCHAR})"
+    )
+
+def distance_filter(max_distance_km):
+    if max_distance_km is None:
+        return "TRUE", []
+    return f"{ident('Actual Distance Flown (km)')} <= ?", [max_distance_km]
+
+def query(con, sql, params=None, name="query"):
+    # Eigen cursor per query, zodat threads de verbinding kunnen delen
+    with stage(f"sql:{name}", kind="query") as record:
+        df = con.cursor().execute(sql, params or []).df()
+        record["rows_out"] = len(df)
+    return df
+
+# -------------------------
+# Queries op de voorbereide store
+# -------------------------
+
+def aggregate(con, dims, store=STORE_DIR, origin=ORIGIN, max_distance_km=None, metrics=METRICS):
+    # Zelfde vorm als aggregates.aggregate: (metric, stat) kolommen met
+    # count/sum/mean en de kwantielen, de dimensies als index
+    where, params = distance_filter(max_distance_km)
+    keys = ", ".join(ident(d) for d in dims)
+    not_null = " AND ".join(f"{ident(d)} IS NOT NULL" for d in dims)
+
+    selects = []
+    for metric in metrics:
+        col = f"CAST({ident(metric)} AS DOUBLE)"
+        selects += [
+            f"count({col}) AS {ident(metric + '|count')}",
+            f"coalesce(sum({col}), 0) AS {ident(metric + '|sum')}",
+            f"avg({col}) AS {ident(metric + '|mean')}",
+        ]
+        selects += [
+            f"quantile_cont({col}, {q}) AS {ident(f'{metric}|q{int(q * 100)}')}"
+            for q in QUANTILES
+        ]
+
+    df = query(con, f"""
+        SELECT {keys}, {", ".join(selects)}
+        FROM {prepared_source(store, origin)}
+        WHERE {where} AND {not_null}
+        GROUP BY {keys}
+        ORDER BY {keys}
+    """, params, name="aggregate")
+
+    df = df.set_index(list(dims))
+    df.columns = pd.MultiIndex.from_tuples(
+        [tuple(col.split("|")) for col in df.columns]
+    )
+    return df
+
+def build_cube(con, store=STORE_DIR, origin=ORIGIN, max_distance_km=None, dimensions=CUBE_DIMENSIONS):
+    return {
+        dims: aggregate(con, dims, store, origin, max_distance_km)
+        for dims in dimensions
+    }
+
+def route_table(con, route, store=STORE_DIR, origin=ORIGIN, max_distance_km=500):
+    # Routefilter als query, met dezelfde sortering en ontdubbeling als
+    # pipeline.build_route_tables. Gelijke scores staan daar in
+    # invoervolgorde, hier op operator, variant en motor.
+    where, params = distance_filter(max_distance_km)
+    order = (
+        f"{ident('CO2 Rating Num')} DESC NULLS LAST, "
+        f"{ident('CO2 per passenger')} ASC NULLS LAST, "
+        f"{ident('Sustainability rating num')} ASC NULLS LAST, "
+        f"{ident('AC Operator')}, {ident('Aircraft Variant')}, {ident('Engine Model')}"
+    )
+    dedupe = ", ".join(ident(col) for col in [
+        "CO2 Rating Num", "CO2 per passenger",
+        "AC Operator", "Aircraft Variant", "Engine Model",
+    ])
+    columns = ", ".join(
+        f"round({ident(col)}, 2) AS {ident(col)}"
+        if col in ("Actual Distance Flown (km)", "CO2 per passenger")
+        else ident(col)
+        for col in ROUTE_COLUMNS
+    )
+    return query(con, f"""
+        SELECT {columns}
+        FROM {prepared_source(store, origin)}
+        WHERE Route = ? AND {where}
+        QUALIFY row_number() OVER (PARTITION BY {dedupe} ORDER BY {order}) = 1
+        ORDER BY {order}
+    """, [route] + params, name="route_table")
+
+def map_rows(con, store=STORE_DIR, origin=ORIGIN, max_distance_km=500):
+    # Eén rij per route, genoeg voor maps.route_geojson
+    where, params = distance_filter(max_distance_km)
+    return query(con, f"""
+        SELECT DISTINCT ON (Vertrek, Bestemming) {", ".join(ident(c) for c in MAP_COLUMNS)}
+        FROM {prepared_source(store, origin)}
+        WHERE {where}
+        ORDER BY Vertrek, Bestemming
+    """, params, name="map_rows")
+
+def destinations(con, store=STORE_DIR, origin=ORIGIN, max_distance_km=500):
+    where, params = distance_filter(max_distance_km)
+    return query(con, f"""
+        SELECT DISTINCT Bestemming
+        FROM {prepared_source(store, origin)}
+        WHERE {where} AND Bestemming IS NOT NULL
+        ORDER BY Bestemming
+    """, params, name="destinations")["Bestemming"]
+
+def scenario_rows(con, store=STORE_DIR, origin=ORIGIN):
+    # Alleen de kolommen die scenario.build_scenario gebruikt
+    return query(con, f"""
+        SELECT {", ".join(ident(c) for c in SCENARIO_COLUMNS)}
+        FROM {prepared_source(store, origin)}
+    """, name="scenario_rows")
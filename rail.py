@@ -0,0 +1,137 @@
+import heapq
+from functools import lru_cache
+
+import pandas as pd
+
+# kg CO₂ per passagier-km per vervoermiddel
+TREINUITSTOOT = {
+    "a Eurostar": 0.009,
+    "an Intercity": 0.0114,
+    "a Regional train": 0.0292,
+    "a Bus": 0.0947,
+    "an ICE": 0.0032
+}
+
+# Spoornetwerk: elke verbinding één keer, in beide richtingen te rijden
+RAIL_EDGES = [
+    ("Amsterdam", "Osnabrück", "an ICE", 215),
+    ("Osnabrück", "Hamburg", "an ICE", 192),
+    ("Osnabrück", "Bremen", "an ICE", 103),
+    ("Hamburg", "Flensburg", "an Intercity", 141),
+    ("Flensburg", "Kolding", "an Intercity", 80),
+    ("Kolding", "Vejle", "an Intercity", 45),
+    ("Vejle", "Billund", "a Bus", 33),
+    ("Amsterdam", "Brussels", "a Eurostar", 176),
+    ("Brussels", "London", "a Eurostar", 317),
+    ("London", "Birmingham", "a Regional train", 163),
+    ("Brussels", "Luxembourg", "an Intercity", 186),
+    ("Amsterdam", "Paris", "a Eurostar", 431),
+    ("Amsterdam", "Arnhem", "an Intercity", 97),
+    ("Arnhem", "Düsseldorf", "an Intercity", 105),
+    ("Amsterdam", "Cologne", "an ICE", 214),
+    ("Cologne", "Frankfurt", "an ICE", 152),
+    ("Amsterdam", "Hannover", "an ICE", 329),
+    ("Amsterdam", "Rotterdam", "an Intercity", 78),
+    ("Rotterdam", "Brussels", "a Eurostar", 147),
+    ("Brussels", "Paris", "a Eurostar", 312),
+    ("Amsterdam", "Eindhoven", "an Intercity", 125),
+    ("Eindhoven", "Düsseldorf", "a Regional train", 120),
+]
+
+# Vertrekluchthaven → station en bestemmingen die anders heten dan hun station
+ORIGIN_STATIONS = {
+    "EHAM": "Amsterdam",
+    "EHEH": "Eindhoven",
+    "EHRD": "Rotterdam",
+    "EBBR": "Brussels",
+}
+DESTINATION_STATIONS = {"Hanover": "Hannover"}
+
+WEIGHTS = ("co2", "km")
+
+def build_graph(edges=RAIL_EDGES):
+    graph = {}
+    for van, naar, vervoer, km in edges:
+        graph.setdefault(van, []).append((naar, vervoer, km))
+        graph.setdefault(naar, []).append((van, vervoer, km))
+    return graph
+
+RAIL_GRAPH = build_graph()
+
+def edge_cost(vervoer, km, weight):
+    if weight == "co2":
+        return km * TREINUITSTOOT[vervoer]
+    return km
+
+@lru_cache(maxsize=None)
+def shortest_path_tree(origin, weight="co2"):
+    # Dijkstra vanaf origin; per station de kosten en het laatste segment
+    if weight not in WEIGHTS:
+        raise ValueError(f"Unknown weight: {weight!r}")
+
+    costs = {origin: 0}
+    previous = {}
+    queue = [(0, origin)]
+    while queue:
+        cost, station = heapq.heappop(queue)
+        if cost > costs[station]:
+            continue
+        for naar, vervoer, km in RAIL_GRAPH.get(station, []):
+            new_cost = cost + edge_cost(vervoer, km, weight)
+            if new_cost < costs.get(naar, float("inf")):
+                costs[naar] = new_cost
+                previous[naar] = (station, vervoer, km)
+                heapq.heappush(queue, (new_cost, naar))
+    return costs, previous
+
+def origin_station(adep):
+    return ORIGIN_STATIONS.get(adep, adep)
+
+def rail_route(destination, origin="Amsterdam", weight="co2"):
+    # Segmenten van origin naar destination, None als er geen spoor is
+    station = DESTINATION_STATIONS.get(destination, destination)
+    _, previous = shortest_path_tree(origin, weight)
+    if station not in previous:
+        return None
+
+    segments = []
+    while station != origin:
+        van, vervoer, km = previous[station]
+        segments.append({"van": van, "naar": station, "vervoer": vervoer, "km": km})
+        station = van
+    return segments[::-1]
+
+def rail_routes(destinations, origin="Amsterdam", weight="co2"):
+    routes = {}
+    for destination in sorted(destinations):
+        segments = rail_route(destination, origin, weight)
+        if segments:
+            routes[destination] = segments
+    return routes
+
+SEGMENT_COLUMNS = ["Bestemming", "Stap", "van", "naar", "vervoer", "km"]
+
+def segment_table(routes):
+    # Eén rij per segment, zodat de uitstoot kolomsgewijs berekend kan worden
+    rows = [
+        (bestemming, stap, seg["van"], seg["naar"], seg["vervoer"], seg["km"])
+        for bestemming, segments in routes.items()
+        for stap, seg in enumerate(segments, start=1)
+    ]
+    return pd.DataFrame(rows, columns=SEGMENT_COLUMNS)
+
+def score_segments(segments, treinuitstoot=TREINUITSTOOT):
+    factors = pd.Series(treinuitstoot, name="kg_per_km")
+    segments = segments.join(factors, on="vervoer", validate="many_to_one")
+    segments["CO2_kg"] = segments["km"] * segments["kg_per_km"]
+    return segments
+
+def route_totals(segments):
+    totals = (
+        segments
+        .groupby("Bestemming", sort=False)
+        .agg(Totale_km=("km", "sum"), Totale_CO2_kg=("CO2_kg", "sum"))
+        .reset_index()
+    )
+    totals["Totale_CO2_kg"] = totals["Totale_CO2_kg"].round(2)
+    return totals
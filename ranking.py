@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+# Per metric of hoger beter is (+1) of lager (-1), en het standaardgewicht
+DIRECTIONS = {
+    "CO2 Rating Num": 1,
+    "CO2 per passenger": -1,
+    "Sustainability rating num": 1,
+}
+WEIGHTS = {metric: 1.0 for metric in DIRECTIONS}
+EXCLUDE = ("Unknown",)
+
+def composite_scores(table, weights=WEIGHTS, min_count=1, exclude=EXCLUDE):
+    # table is één cube tabel met (metric, stat) kolommen. Elke metric wordt
+    # over de meegetelde entiteiten naar 0 (slechtst) .. 1 (best) geschaald,
+    # de score is het gewogen gemiddelde van de beschikbare metrics.
+    metrics = [m for m, w in weights.items() if w]
+    means = table.xs("mean", axis=1, level=1)[metrics].to_numpy(dtype=float)
+    counts = table.xs("count", axis=1, level=1)[metrics].to_numpy(dtype=float)
+
+    eligible = np.nanmin(counts, axis=1) >= min_count if metrics else np.zeros(len(table), bool)
+    if exclude:
+        labels = table.index.to_frame(index=False).astype(str)
+        eligible &= ~labels.isin(exclude).any(axis=1).to_numpy()
+
+    scores = np.full(len(table), np.nan)
+    if not eligible.any():
+        return pd.Series(scores, index=table.index, name="score")
+
+    values = means[eligible]
+    with np.errstate(all="ignore"):
+        lo = np.nanmin(values, axis=0)
+        hi = np.nanmax(values, axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    scaled = (values - lo) / span
+    directions = np.array([DIRECTIONS.get(m, 1) for m in metrics])
+    scaled = np.where(directions > 0, scaled, 1 - scaled)
+
+    w = np.array([weights[m] for m in metrics], dtype=float)
+    present = ~np.isnan(scaled)
+    total = (present * w).sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        scores[eligible] = np.where(
+            total > 0, np.nansum(scaled * w, axis=1) / total, np.nan
+        )
+    return pd.Series(scores, index=table.index, name="score")
+
+def top_k(scores, k=3):
+    # argpartition haalt de k hoogste in O(n), alleen die k worden gesorteerd
+    values = scores.to_numpy(dtype=float)
+    candidates = np.flatnonzero(~np.isnan(values))
+    if k < len(candidates):
+        best = np.argpartition(-values[candidates], k - 1)[:k]
+        candidates = candidates[best]
+    order = candidates[np.argsort(-values[candidates], kind="stable")]
+    return scores.iloc[order]
+
+def rank(cube, dims, k=3, weights=WEIGHTS, min_count=1, exclude=EXCLUDE):
+    if isinstance(dims, str):
+        dims = (dims,)
+    return top_k(composite_scores(cube[tuple(dims)], weights, min_count, exclude), k)
@@ -0,0 +1,54 @@
+import numpy as np
+
+def build_scenario(dfmerge, train_totals):
+    # Vluchten één keer gesorteerd op afstand met cumulatieve sommen, zodat
+    # elke afstandsgrens een binary search plus een verschil is. Zonder
+    # afstand valt een vlucht onder geen enkele grens.
+    df = dfmerge.dropna(subset=["Actual Distance Flown (km)"]).sort_values(
+        "Actual Distance Flown (km)", kind="stable"
+    )
+
+    flight_co2 = df["Total CO2 Emissions (kg)"].fillna(0).to_numpy(dtype=float)
+    passengers = (
+        df["Total CO2 Emissions (kg)"] / df["CO2 per passenger"]
+    ).replace([np.inf, -np.inf], np.nan).fillna(0).to_numpy(dtype=float)
+
+    # Treinuitstoot per passagier van de bestemming, NaN zonder spoorroute
+    train_per_passenger = (
+        df["Bestemming"]
+        .astype(object)
+        .map(train_totals.set_index("Bestemming")["Totale_CO2_kg"])
+        .to_numpy(dtype=float)
+    )
+    matched = ~np.isnan(train_per_passenger)
+
+    def cumulative(values):
+        return np.concatenate([[0.0], np.cumsum(values)])
+
+    return {
+        "distance": df["Actual Distance Flown (km)"].to_numpy(dtype=float),
+        "flights": cumulative(np.ones(len(df))),
+        "flight_co2": cumulative(flight_co2),
+        "passengers": cumulative(passengers),
+        "matched_flights": cumulative(matched),
+        "matched_flight_co2": cumulative(np.where(matched, flight_co2, 0)),
+        "train_co2": cumulative(
+            np.where(matched, passengers * np.nan_to_num(train_per_passenger), 0)
+        ),
+    }
+
+def scenario_at(scenario, max_distance_km):
+    # Alle vluchten tot en met max_distance_km gaan met de trein
+    n = np.searchsorted(scenario["distance"], max_distance_km, side="right")
+    result = {
+        key: float(values[n])
+        for key, values in scenario.items()
+        if key != "distance"
+    }
+    result["co2_saved"] = result["matched_flight_co2"] - result["train_co2"]
+    return result
+
+def max_distance(scenario):
+    # Bovengrens van de afstandsslider, in hele km
+    distance = scenario["distance"]
+    return int(np.ceil(distance[-1])) if len(distance) else 0
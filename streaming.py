@@ -0,0 +1,230 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from aggregates import CUBE_DIMENSIONS, METRICS
+from diagnostics import stage
+from pipeline import (
+    FLIGHT_COLUMNS,
+    FLIGHTS_SOURCE,
+    ORIGIN,
+    PIPELINE_VERSION,
+    STORE_DIR,
+    SUSTAINABILITY_CSV,
+    origin_store,
+    sustainability_batches,
+    apply_group_fills,
+    default_impute_strategies,
+    discover_flight_files,
+    finish_prepared,
+    flight_file_keys,
+    input_fingerprint,
+    merge_destinations,
+    modes_from_counts,
+    read_manifest,
+    write_manifest,
+    write_prepared_partitions,
+)
+
+# Rijen per batch; het geheugen hangt hiervan af en niet van de invoergrootte
+BATCH_ROWS = 500_000
+# Per bestemming een uniforme steekproef van maximaal zoveel rijen voor de
+# mediaan; voor kleinere groepen is die exact
+SAMPLE_ROWS = 10_000
+COORD_COLUMNS = ["ADEP", "ADES", "ADES Latitude", "ADES Longitude"]
+
+# -------------------------
+# Invoer in batches
+# -------------------------
+
+def stream_destination_dim(source=FLIGHTS_SOURCE, origin=ORIGIN, batch_rows=BATCH_ROWS):
+    # Alleen unieke ADES bewaren, dus begrensd door het aantal luchthavens
+    dataset = ds.dataset(discover_flight_files(source), format="parquet")
+    dim = pd.DataFrame(columns=FLIGHT_COLUMNS)
+    for batch in dataset.to_batches(
+        columns=FLIGHT_COLUMNS,
+        filter=ds.field("ADEP") == origin,
+        batch_size=batch_rows,
+    ):
+        dim = pd.concat([dim, batch.to_pandas()]).drop_duplicates(subset="ADES")
+
+    # Eerste coördinaten per ADES, zoals build_destination_dim
+    coords = None
+    for chunk in sustainability_batches(origin, batch_rows, usecols=COORD_COLUMNS):
+        chunk = chunk.drop_duplicates(subset="ADES")
+        coords = chunk if coords is None else (
+            pd.concat([coords, chunk]).drop_duplicates(subset="ADES")
+        )
+    if coords is not None:
+        dim = dim.merge(coords.drop(columns="ADEP"), on="ADES", how="left")
+    return dim.reset_index(drop=True)
+
+# -------------------------
+# Pass 1: imputatiewaarden
+# -------------------------
+
+def stream_group_fills(dim, origin=ORIGIN, batch_rows=BATCH_ROWS, seed=0):
+    # Mediaan uit een bottom-k steekproef per groep, gemiddelde uit sommen
+    # en aantallen, modus uit opgetelde value counts. Alles is mergebaar
+    # tussen batches.
+    rng = np.random.default_rng(seed)
+    by = "Bestemming"
+    strategies = None
+    sample = None
+    sums = counts = None
+    mode_counts = {}
+
+    for chunk in sustainability_batches(origin, batch_rows):
+        dfmerge = merge_destinations(chunk, dim, origin)
+        if strategies is None:
+            strategies = default_impute_strategies(dfmerge, by)
+        median_cols = [c for c, s in strategies.items() if s == "median"]
+        mean_cols = [c for c, s in strategies.items() if s == "mean"]
+
+        if median_cols:
+            keyed = dfmerge[[by] + median_cols].assign(_key=rng.random(len(dfmerge)))
+            if sample is not None:
+                keyed = pd.concat([sample, keyed], ignore_index=True)
+            sample = keyed.sort_values("_key").groupby(by).head(SAMPLE_ROWS)
+
+        if mean_cols:
+            grouped = dfmerge.groupby(by)[mean_cols]
+            batch_sums, batch_counts = grouped.sum(), grouped.count()
+            sums = batch_sums if sums is None else sums.add(batch_sums, fill_value=0)
+            counts = batch_counts if counts is None else counts.add(batch_counts, fill_value=0)
+
+        for col, strategy in strategies.items():
+            if strategy == "mode":
+                batch_counts = dfmerge.groupby([by, col]).size()
+                old = mode_counts.get(col)
+                mode_counts[col] = (
+                    batch_counts if old is None
+                    else old.add(batch_counts, fill_value=0)
+                )
+
+    fills = {}
+    if sample is not None:
+        medians = sample.groupby(by)[[c for c in sample.columns if c not in (by, "_key")]].median()
+        fills.update({col: medians[col] for col in medians.columns})
+    if sums is not None:
+        means = sums / counts
+        fills.update({col: means[col] for col in means.columns})
+    for col, counts_per_value in mode_counts.items():
+        fills[col] = modes_from_counts(counts_per_value.reset_index(name="n"), by, col)
+
+    # Zelfde kolomvolgorde als de in-memory pipeline
+    order = list(strategies or {})
+    return pd.DataFrame(fills).reindex(columns=[c for c in order if c in fills])
+
+# -------------------------
+# Aggregaten
+# -------------------------
+
+def aggregate_name(dims):
+    return "+".join(dims)
+
+def partial_aggregates(dfmerge, partials, dimensions=CUBE_DIMENSIONS):
+    # count en sum per batch optellen; mean volgt aan het eind
+    values = dfmerge.assign(**{m: dfmerge[m].astype("float64") for m in METRICS})
+    for dims in dimensions:
+        keys = values[list(dims)].astype(object)
+        batch = values[METRICS].groupby([keys[d] for d in dims]).agg(["count", "sum"])
+        old = partials.get(dims)
+        partials[dims] = batch if old is None else old.add(batch, fill_value=0)
+    return partials
+
+def write_aggregates(partials, store):
+    path = os.path.join(store, "aggregates")
+    os.makedirs(path, exist_ok=True)
+    for dims, table in partials.items():
+        table = table.copy()
+        for metric in METRICS:
+            table[(metric, "mean")] = table[(metric, "sum")] / table[(metric, "count")]
+        table.columns = [f"{metric}|{stat}" for metric, stat in table.columns]
+        table.reset_index().to_parquet(
+            os.path.join(path, f"{aggregate_name(dims)}.parquet"), index=False
+        )
+    return [aggregate_name(dims) for dims in partials]
+
+def has_aggregates(store=STORE_DIR, origin=ORIGIN, dimensions=CUBE_DIMENSIONS):
+    # ingest verwijdert de aggregaten zodra ze niet meer kloppen
+    names = read_manifest(origin_store(store, origin)).get("aggregates", [])
+    return all(aggregate_name(dims) in names for dims in dimensions)
+
+def read_aggregates(store=STORE_DIR, origin=ORIGIN, dimensions=CUBE_DIMENSIONS):
+    # Zelfde vorm als aggregates.build_cube, zodat cube_stat ermee werkt
+    store = origin_store(store, origin)
+    cube = {}
+    for dims in dimensions:
+        path = os.path.join(store, "aggregates", f"{aggregate_name(dims)}.parquet")
+        if not os.path.exists(path):
+            continue
+        table = pd.read_parquet(path).set_index(list(dims))
+        table.columns = pd.MultiIndex.from_tuples(
+            [tuple(col.split("|")) for col in table.columns]
+        )
+        cube[dims] = table
+    return cube
+
+# -------------------------
+# Pass 2: voorbereide partities
+# -------------------------
+
+def stream_prepare(
+    source=FLIGHTS_SOURCE, store=STORE_DIR, origin=ORIGIN, batch_rows=BATCH_ROWS
+):
+    # Bouwt de partitie van origin opnieuw op in batches; daarna kan ingest
+    # nieuwe maanden toevoegen
+    store = origin_store(store, origin)
+    shutil.rmtree(store, ignore_errors=True)
+    os.makedirs(store)
+
+    with stage("stream:destination_dim") as record:
+        dim = stream_destination_dim(source, origin, batch_rows)
+        record["rows_out"] = len(dim)
+
+    with stage("stream:group_fills") as record:
+        fills = stream_group_fills(dim, origin, batch_rows)
+        record["rows_out"] = len(fills)
+
+    partials = {}
+    columns = None
+    rows = 0
+    with stage("stream:prepare") as record:
+        for i, chunk in enumerate(sustainability_batches(origin, batch_rows)):
+            dfmerge = merge_destinations(chunk, dim, origin)
+            dfmerge = finish_prepared(apply_group_fills(dfmerge, "Bestemming", fills))
+            if dfmerge.empty:
+                continue
+
+            write_prepared_partitions(
+                dfmerge, store,
+                existing_data_behavior="overwrite_or_ignore",
+                basename_template=f"batch-{i}-{{i}}.parquet"
+            )
+            partial_aggregates(dfmerge, partials)
+            columns = list(dfmerge.columns)
+            rows += len(dfmerge)
+        record["rows_out"] = rows
+
+    aggregates = write_aggregates(partials, store)
+    dim.to_parquet(os.path.join(store, "destinations.parquet"), index=False)
+    fills.rename_axis("Bestemming").reset_index().to_parquet(
+        os.path.join(store, "group_stats.parquet"), index=False
+    )
+
+    manifest = {
+        "pipeline_version": PIPELINE_VERSION,
+        "sustainability": input_fingerprint([SUSTAINABILITY_CSV]),
+        "files": flight_file_keys(source),
+        "aggregates": aggregates,
+        # Benaderd, zie store_is_current
+        "builder": "stream",
+    }
+    if columns is not None:
+        manifest["columns"] = columns
+    write_manifest(manifest, store)
+    return rows